@@ -1,6 +1,49 @@
 if exists('g:loaded_taskwiki_auto') | finish | endif
 let g:loaded_taskwiki_auto = 1
 
+" Determine the plugin path
+let s:plugin_path = escape(expand('<sfile>:p:h:h'), '\')
+
+function! taskwiki#Init() abort
+  if exists('g:did_python_taskwiki')
+    return
+  endif
+
+  " Execute the main body of taskwiki source
+  execute g:taskwiki_pyfile . s:plugin_path . '/taskwiki/main.py'
+
+  " Do not let background saves get interrupted by exiting
+  augroup taskwiki_global
+    autocmd!
+    execute "autocmd VimLeavePre * :" . g:taskwiki_py . "cache.wait_for_saves()"
+  augroup END
+
+  let g:did_python_taskwiki = 1
+endfunction
+
+" Loads the buffer once it is drawn, so that opening it is not delayed
+function! taskwiki#DeferLoad() abort
+  if has('timers')
+    call timer_start(0, function('taskwiki#LoadBuffer', [bufnr('%')]))
+  else
+    TaskWikiBufferLoad
+  endif
+endfunction
+
+function! taskwiki#LoadBuffer(bufnr, timer) abort
+  if !exists('g:did_python_taskwiki')
+    " Let the versions of the task binaries be obtained in the background,
+    " while vim keeps processing the input until the next tick
+    call taskwiki#Init()
+    call timer_start(0, function('taskwiki#LoadBuffer', [a:bufnr]))
+  elseif bufnr('%') == a:bufnr
+    TaskWikiBufferLoad
+  elseif bufexists(a:bufnr)
+    " Another buffer was entered meanwhile, wait for this one
+    execute 'autocmd taskwiki BufEnter <buffer=' . a:bufnr . '> ++once TaskWikiBufferLoad'
+  endif
+endfunction
+
 function! taskwiki#MkView() abort
   let viewoptions = &viewoptions
   set viewoptions-=options
@@ -13,6 +56,135 @@ function! taskwiki#LoadView() abort
   silent! doautocmd SessionLoadPost
 endfunction
 
+function! taskwiki#PollSave(bufnr, timer) abort
+  execute g:taskwiki_py . 'WholeBuffer.poll_update_to_tw(' . a:bufnr . ', ' . a:timer . ')'
+endfunction
+
+" Split reports running in the background, indexed by the buffer number
+let s:reports = {}
+
+function! taskwiki#StartReport(bufnr, command, env) abort
+  let report = {'output': [], 'errors': [], 'partial': {'out': '', 'err': ''}}
+  let s:reports[a:bufnr] = report
+
+  if has('nvim')
+    let report.job = jobstart(a:command, {
+          \ 'env': a:env,
+          \ 'on_stdout': function('s:OnReportOutput', [a:bufnr]),
+          \ 'on_stderr': function('s:OnReportErrors', [a:bufnr]),
+          \ 'on_exit': function('s:OnReportExit', [a:bufnr]),
+          \ })
+  else
+    let report.job = job_start(a:command, {
+          \ 'env': a:env,
+          \ 'in_io': 'null',
+          \ 'out_cb': function('s:OnReportOutput', [a:bufnr]),
+          \ 'err_cb': function('s:OnReportErrors', [a:bufnr]),
+          \ 'exit_cb': function('s:OnReportExit', [a:bufnr]),
+          \ 'close_cb': function('s:OnReportClose', [a:bufnr]),
+          \ })
+  endif
+
+  " Closing the split cancels the report
+  execute 'autocmd BufWipeout <buffer=' . a:bufnr . '> call taskwiki#StopReport(' . a:bufnr . ')'
+endfunction
+
+function! taskwiki#StopReport(bufnr) abort
+  if !has_key(s:reports, a:bufnr)
+    return
+  endif
+
+  let report = remove(s:reports, a:bufnr)
+  if has('nvim')
+    call jobstop(report.job)
+  else
+    call job_stop(report.job)
+  endif
+
+  execute g:taskwiki_py . 'pending_reports.pop(' . a:bufnr . ', None)'
+endfunction
+
+" Returns the output of the finished report and forgets about it
+function! taskwiki#ReportOutput(bufnr) abort
+  return remove(s:reports, a:bufnr)
+endfunction
+
+" Vim passes a single line, neovim a list where the first item continues
+" the last incomplete line and the last item is incomplete
+function! s:ReportLines(report, stream, data) abort
+  if type(a:data) == v:t_string
+    return [a:data]
+  endif
+
+  let lines = copy(a:data)
+  let lines[0] = a:report.partial[a:stream] . lines[0]
+  let a:report.partial[a:stream] = remove(lines, -1)
+  return lines
+endfunction
+
+function! s:AppendReportLines(bufnr, lines) abort
+  let report = s:reports[a:bufnr]
+  if empty(a:lines) || !bufexists(a:bufnr)
+    return
+  endif
+
+  call setbufvar(a:bufnr, '&modifiable', 1)
+
+  " Replace the placeholder by the first lines of the output
+  if empty(report.output)
+    silent call deletebufline(a:bufnr, 1, '$')
+  endif
+
+  call setbufline(a:bufnr, len(report.output) + 1, a:lines)
+  call setbufvar(a:bufnr, '&modifiable', 0)
+  call extend(report.output, a:lines)
+endfunction
+
+function! s:OnReportOutput(bufnr, job, data, ...) abort
+  if has_key(s:reports, a:bufnr)
+    let lines = s:ReportLines(s:reports[a:bufnr], 'out', a:data)
+    call s:AppendReportLines(a:bufnr, map(lines, 'substitute(v:val, "\\s\\+$", "", "")'))
+  endif
+endfunction
+
+function! s:OnReportErrors(bufnr, job, data, ...) abort
+  if has_key(s:reports, a:bufnr)
+    let report = s:reports[a:bufnr]
+    call extend(report.errors, s:ReportLines(report, 'err', a:data))
+  endif
+endfunction
+
+function! s:OnReportExit(bufnr, job, status, ...) abort
+  if has_key(s:reports, a:bufnr)
+    let report = s:reports[a:bufnr]
+    let report.status = a:status
+
+    " Neovim delivers all the output before the exit
+    if has('nvim')
+      call s:AppendReportLines(a:bufnr, filter([report.partial.out], 'len(v:val)'))
+      call extend(report.errors, filter([report.partial.err], 'len(v:val)'))
+      let report.closed = 1
+    endif
+
+    call s:FinishReport(a:bufnr)
+  endif
+endfunction
+
+function! s:OnReportClose(bufnr, channel) abort
+  if has_key(s:reports, a:bufnr)
+    let s:reports[a:bufnr].closed = 1
+    call s:FinishReport(a:bufnr)
+  endif
+endfunction
+
+" Vim may close the channel before or after the job exits, wait for both
+function! s:FinishReport(bufnr) abort
+  let report = s:reports[a:bufnr]
+  if has_key(report, 'status') && get(report, 'closed')
+    execute g:taskwiki_py . 'Split.finish_report(' . a:bufnr . ', ' . report.status . ')'
+  endif
+endfunction
+
 function! taskwiki#FoldInit() abort
   " Unless vimwiki is configured to use its folding, set our own
   if &foldtext !~? 'VimwikiFold'
@@ -34,11 +206,13 @@ function! taskwiki#FoldText()
 endfunction
 
 function! taskwiki#CompleteMod(arglead, line, pos) abort
+  call taskwiki#Init()
   return py3eval('cache().get_relevant_completion().modify(vim.eval("a:arglead"))')
 endfunction
 
 function! taskwiki#CompleteOmni(findstart, base) abort
   if a:findstart == 1
+    call taskwiki#Init()
     let line = getline('.')[:col('.')-2]
 
     " Complete modstring after -- in new tasks
@@ -0,0 +1,30 @@
+"""
+Measures finding the lines to write into the buffer on a push, on pages of
+tasks separated by blank lines, with every task edited.
+
+Usage: python -m benchmarks.buffer_diff
+"""
+
+from benchmarks import common
+
+from taskwiki import util
+
+
+def page(size, mark):
+    lines = []
+    for i in range(size // 2):
+        lines += ['* [{0}] Task {1}'.format(mark, i), '']
+    return lines
+
+
+def main():
+    for size in (1000, 5000, 20000):
+        old, new = page(size, ' '), page(size, 'X')
+        common.measure(
+            'changed hunks, {0} lines all edited'.format(size),
+            lambda: util.changed_line_hunks(old, new)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+Helpers shared by the benchmarks. The benchmarks run outside of vim, hence
+the vim module is replaced by the mock used in the tests.
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from tests.base import MockVim, MockCache
+
+sys.modules['vim'] = MockVim()
+
+
+def measure(name, function, repeat=5, number=1):
+    """
+    Prints the best time of the given function, in milliseconds.
+    """
+
+    best = min(timeit.repeat(function, repeat=repeat, number=number))
+    print("{0:<50} {1:>10.2f} ms".format(name, best * 1000 / number))
+
+
+def mock_cache():
+    return MockCache()
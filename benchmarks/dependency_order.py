@@ -0,0 +1,62 @@
+"""
+Measures ordering the tasks of the buffer for saving, on synthetic outlines
+that are either deep (long chain of nested subtasks) or wide (many subtasks
+of a single task).
+
+Usage: python -m benchmarks.dependency_order
+"""
+
+from benchmarks import common
+
+from taskwiki.cache import TaskCache
+
+
+class OutlineTask(dict):
+    def __init__(self, line_number):
+        super(OutlineTask, self).__init__(line_number=line_number)
+        self.add_dependencies = set()
+
+    def __hash__(self):
+        return self['line_number']
+
+
+def deep_outline(size):
+    cache = common.mock_cache()
+    tasks = [OutlineTask(i) for i in range(size)]
+
+    for parent, child in zip(tasks, tasks[1:]):
+        parent.add_dependencies.add(child)
+
+    for task in tasks:
+        cache.vwtask[task['line_number']] = task
+
+    return cache
+
+
+def wide_outline(size):
+    cache = common.mock_cache()
+    tasks = [OutlineTask(i) for i in range(size)]
+    tasks[0].add_dependencies.update(tasks[1:])
+
+    for task in tasks:
+        cache.vwtask[task['line_number']] = task
+
+    return cache
+
+
+def order(cache):
+    return list(TaskCache.vimwikitask_dependency_order.fget(cache))
+
+
+def main():
+    for size in (100, 1000, 5000):
+        for name, outline in (('deep', deep_outline), ('wide', wide_outline)):
+            cache = outline(size)
+            common.measure(
+                'dependency order, {0} outline of {1} tasks'.format(name, size),
+                lambda: order(cache)
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Measures populating a viewport with tasks, that is inserting lines into
+a large buffer one by one, as ViewPort.sync_with_taskwarrior does.
+
+Usage: python -m benchmarks.line_store
+"""
+
+from benchmarks import common
+
+from taskwiki import store
+from taskwiki.cache import TaskCache
+from taskwiki.vwtask import VimwikiTask
+
+
+def populate(size, added):
+    cache = common.mock_cache()
+    cache.viewport = store.ViewportStore(cache)
+    cache.buffer.data = ['* [ ] Task {0}'.format(i) for i in range(size)]
+
+    # Parse the buffer, as the sync does before adding the tasks
+    for i in range(size):
+        cache.line[(VimwikiTask, i)]
+
+    for i in range(added):
+        TaskCache.insert_line(cache, '* [ ] New task {0}'.format(i), 1 + i)
+
+
+def main():
+    for size in (1000, 5000):
+        for added in (100, 1000):
+            common.measure(
+                'insert {0} lines into {1} lines buffer'.format(added, size),
+                lambda: populate(size, added),
+                repeat=3,
+            )
+
+
+if __name__ == '__main__':
+    main()
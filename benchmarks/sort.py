@@ -0,0 +1,73 @@
+"""
+Measures sorting viewports of various sizes, where every fifth task has
+subtasks.
+
+Usage: python -m benchmarks.sort
+"""
+
+import functools
+import random
+import uuid
+
+from benchmarks import common
+
+from tasklib.lazy import LazyUUIDTaskSet
+
+from taskwiki import store
+from taskwiki.cache import TaskCache
+from taskwiki.sort import TaskSorter
+
+
+class SortedTask(object):
+    def __init__(self, line_number, task):
+        self.task = task
+        self.vim_data = dict(line_number=line_number, indent='')
+
+    def __getitem__(self, key):
+        if key in self.vim_data:
+            return self.vim_data[key]
+        return self.task.get(key)
+
+    def __setitem__(self, key, value):
+        self.vim_data[key] = value
+
+    def update_in_buffer(self):
+        pass
+
+
+def viewport(size):
+    cache = common.mock_cache()
+    cache.viewport = store.ViewportStore(cache)
+    cache.reorder_lines = functools.partial(TaskCache.reorder_lines, cache)
+    cache.swap_lines = functools.partial(TaskCache.swap_lines, cache)
+    cache.buffer.data = ['* [ ] Task {0}'.format(i) for i in range(size)]
+
+    tasks = [
+        dict(uuid=str(uuid.uuid4()), due=random.choice([None, 1, 2, 3]),
+             project=random.choice(['Home', 'Work']))
+        for i in range(size)
+    ]
+
+    for i, task in enumerate(tasks):
+        subtasks = tasks[i + 1:i + 5] if i % 5 == 0 else []
+        task['depends'] = LazyUUIDTaskSet(None, [t['uuid'] for t in subtasks])
+
+    vwtasks = [SortedTask(i, task) for i, task in enumerate(tasks)]
+    for vwtask in vwtasks:
+        cache.vwtask[vwtask['line_number']] = vwtask
+
+    return cache, set(vwtasks)
+
+
+def main():
+    for size in (100, 500, 1000, 5000):
+        cache, tasks = viewport(size)
+        common.measure(
+            'sort viewport of {0} tasks'.format(size),
+            lambda: TaskSorter(cache, tasks, 'due+,project-').execute(),
+            repeat=3,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures opening a split with a report, with the vim commands batched and
+executed one by one. Every call into vim is delayed to simulate the round
+trip to neovim.
+
+Usage: python -m benchmarks.split
+"""
+
+import json
+import time
+
+from benchmarks import common
+
+from taskwiki import util
+
+# Typical duration of a round trip to neovim over its RPC channel
+ROUND_TRIP = 0.0002
+
+
+class RemoteObject(object):
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class RemoteVim(object):
+    """
+    Stands in for the vim module, counting the calls and keeping just
+    enough state for show_in_split.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.name = ''
+        self.vars = dict()
+
+        window = RemoteObject(
+            buffer=RemoteObject(name='report.123', valid=True),
+            options={'cursorline': True},
+            number=1,
+        )
+        self.current = RemoteObject(
+            tabpage=RemoteObject(windows=[window]),
+            window=window,
+            buffer=RemoteObject(number=2),
+        )
+
+    def command(self, command):
+        self.calls += 1
+        time.sleep(ROUND_TRIP)
+
+        if command.startswith('call execute('):
+            commands = json.loads(command[len('call execute('):-1])
+        else:
+            commands = [command]
+
+        for command in commands:
+            if command.startswith('edit '):
+                self.name = command[len('edit '):]
+
+    def eval(self, expression):
+        self.calls += 1
+        time.sleep(ROUND_TRIP)
+        return self.name
+
+
+class UnbatchedCommands(util.CommandBatch):
+    def command(self, command):
+        util.vim.command(command)
+
+
+def open_split(remote, lines):
+    util.vim = remote
+    util.show_in_split(lines, name='report', activate_cursorline=True)
+
+
+def main():
+    lines = ['Line {0}'.format(i) for i in range(50)]
+    original_vim, original_batch = util.vim, util.CommandBatch
+
+    for name, batch in (('batched', original_batch), ('unbatched', UnbatchedCommands)):
+        util.CommandBatch = batch
+        remote = RemoteVim()
+
+        common.measure(
+            'open a split, {0}'.format(name),
+            lambda: open_split(remote, lines),
+            number=20,
+        )
+
+        remote.calls = 0
+        open_split(remote, lines)
+        print('{0:<50} {1:>10}'.format('calls into vim, ' + name, remote.calls))
+
+    util.vim, util.CommandBatch = original_vim, original_batch
+
+
+if __name__ == '__main__':
+    main()
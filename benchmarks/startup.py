@@ -0,0 +1,112 @@
+"""
+Measures the time vim needs to open a vimwiki page, with and without
+taskwiki, as reported by vim --startuptime.
+
+Loading the page into taskwiki is deferred until the page is drawn, hence
+it is not part of the startup. Its cost is measured separately, by timing
+:TaskWikiBufferLoad, if vim has the python support.
+
+The path to vimwiki can be passed in the VIMWIKI environment variable,
+otherwise only the taskwiki ftplugin is sourced.
+
+Usage: python -m benchmarks.startup
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+try:
+    from shutil import which
+except ImportError:
+    # Python 2
+    from distutils.spawn import find_executable as which
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_vim(plugins, page, commands):
+    command = ['vim', '-N', '-u', 'NONE', '-i', 'NONE', '--not-a-term']
+
+    for plugin in plugins:
+        command += ['--cmd', 'set runtimepath^={0}'.format(plugin)]
+        command += ['--cmd', 'set runtimepath+={0}/after'.format(plugin)]
+
+    command += ['--cmd', 'filetype plugin on', '--cmd', 'syntax on']
+    command += ['-c', 'set filetype=vimwiki'] + commands
+    command += ['-c', 'qa!', page]
+
+    with open(os.devnull, 'w') as devnull:
+        subprocess.call(command, stdout=devnull, stderr=devnull)
+
+
+def startup_time(plugins, page, log):
+    if os.path.exists(log):
+        os.remove(log)
+
+    run_vim(plugins, page, ['--startuptime', log])
+
+    # The first column of the last line is the total elapsed time
+    with open(log) as f:
+        return float(f.readlines()[-1].split()[0])
+
+
+def load_time(plugins, page, log):
+    if os.path.exists(log):
+        os.remove(log)
+
+    # The -c commands run after the startup, before vim quits, so the load
+    # is timed explicitly instead of waiting for the deferred one
+    run_vim(plugins, page, [
+        '-c', 'let g:start = reltime()',
+        '-c', 'silent! TaskWikiBufferLoad',
+        '-c', "call writefile([string(1000 * reltimefloat(reltime(g:start)))],"
+              " '{0}')".format(log),
+    ])
+
+    with open(log) as f:
+        return float(f.read())
+
+
+def has_python():
+    output = subprocess.check_output(['vim', '--version']).decode('utf-8')
+    return '+python3' in output or '+python ' in output
+
+
+def main():
+    if which('vim') is None:
+        print("vim is not available, skipping the startup benchmark")
+        return
+
+    directory = tempfile.mkdtemp()
+    page = os.path.join(directory, 'index.wiki')
+    log = os.path.join(directory, 'startuptime.log')
+
+    with open(page, 'w') as f:
+        f.write('== Tasks | +PENDING ==\n')
+
+    vimwiki = [os.environ['VIMWIKI']] if 'VIMWIKI' in os.environ else []
+
+    for name, plugins in (
+        ('open a page without taskwiki', vimwiki),
+        ('open a page with taskwiki', vimwiki + [BASE_DIR]),
+    ):
+        best = min(startup_time(plugins, page, log) for _ in range(5))
+        print("{0:<50} {1:>10.2f} ms".format(name, best))
+
+    if has_python():
+        plugins = vimwiki + [BASE_DIR]
+        best = min(load_time(plugins, page, log) for _ in range(5))
+        print("{0:<50} {1:>10.2f} ms".format(
+            'load the page after it is drawn', best))
+    else:
+        print("vim has no python support, skipping the deferred load")
+
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures generating the tags of a whole wiki of 2000 pages, one process per
+file as Tagbar does, and with a single run over the wiki directory.
+
+Usage: python -m benchmarks.vwtags
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from extra import vwtags
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(BASE_DIR, 'extra', 'vwtags.py')
+
+PAGES = 2000
+
+
+def create_wiki(directory):
+    for page in range(PAGES):
+        lines = ['= Page {0} ='.format(page)]
+        for section in range(5):
+            lines.append('== Section {0} | project:p{1} =='.format(section, page))
+            lines += ['* [ ] Task {0} #{1:08x}'.format(i, i) for i in range(20)]
+            lines += ['Some text about the section.'] * 10
+
+        with open(os.path.join(directory, 'page{0}.wiki'.format(page)), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    create_wiki(directory)
+
+    # Spawning the interpreter dominates, measure a sample of the files
+    sample = vwtags.wiki_files(directory, '.wiki')[:100]
+    best = min(timeit.repeat(
+        lambda: [
+            subprocess.check_output([sys.executable, SCRIPT, 'default', os.path.join(directory, f)])
+            for f in sample
+        ],
+        repeat=3, number=1,
+    ))
+    print("{0:<50} {1:>10.2f} ms".format(
+        'process per file, {0} pages (estimated)'.format(PAGES), best * 1000 * PAGES / len(sample)))
+
+    for name, processes in (('single process', 1), ('process pool', None)):
+        best = min(timeit.repeat(
+            lambda: subprocess.check_call([
+                sys.executable, SCRIPT, 'default', '--wiki', directory,
+                '--processes', str(processes or os.cpu_count() or 1),
+            ]),
+            repeat=3, number=1,
+        ))
+        print("{0:<50} {1:>10.2f} ms".format(
+            'whole wiki, {0}, {1} pages'.format(name, PAGES), best * 1000))
+
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
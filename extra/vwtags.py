@@ -1,9 +1,26 @@
 #! /usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+Generates tags of the headers, presets and viewports in vimwiki files.
+
+Usage:
+    vwtags.py <syntax> <filename>
+        Prints the tags of a single file, as used by Tagbar.
+
+    vwtags.py <syntax> --wiki <directory> [--extension <ext>]
+              [--output <file>] [--processes <n>]
+        Writes a single sorted tags file for all the files of the wiki, with
+        the filenames relative to the wiki directory. By default, the tags are
+        written to the tags file in the wiki directory.
+"""
+
+import argparse
+import multiprocessing
 import os
 import re
 import sys
+import tempfile
 
 if __name__ == '__main__':
     path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
@@ -11,6 +28,21 @@ if __name__ == '__main__':
 
 from taskwiki import regexp
 
+# All the headers start with this character, other lines can be skipped
+# without trying the regexes
+HEADER_START = {
+    'default': '=',
+    'markdown': '#',
+}
+
+DEFAULT_EXTENSION = {
+    'default': '.wiki',
+    'markdown': '.md',
+}
+
+# Starting the processes costs more than parsing a handful of files
+POOL_THRESHOLD = 64
+
 
 def match_header(line, syntax):
     m = re.search(regexp.VIEWPORT[syntax], line)
@@ -30,7 +62,12 @@ def match_header(line, syntax):
 
 def process(file_content, filename, syntax):
     parents = [None] * 6
+    header_start = HEADER_START[syntax]
+
     for lnum, line in enumerate(file_content):
+        if not line.startswith(header_start):
+            continue
+
         cur_kind_long, m = match_header(line, syntax)
         if not m:
             continue
@@ -55,19 +92,111 @@ def process(file_content, filename, syntax):
             cur_tag, filename, cur_searchterm, cur_kind, str(lnum+1), scope))
 
 
-if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        exit()
+def process_file(args):
+    """
+    Returns the tags of the given file, named by the given filename in the
+    tags. Files that cannot be read or parsed have no tags.
+    """
+
+    path, filename, syntax = args
+
+    try:
+        with open(path, "r") as f:
+            return list(process(f, filename, syntax))
+    except (AssertionError, EnvironmentError, UnicodeDecodeError):
+        return []
+
+
+def wiki_files(directory, extension):
+    """
+    Returns the paths of the files with the given extension in the wiki
+    directory and its subdirectories, relative to the directory.
+    """
+
+    files = []
 
-    syntax = sys.argv[1]
-    filename = sys.argv[2]
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.endswith(extension):
+                path = os.path.join(root, filename)
+                files.append(os.path.relpath(path, directory))
+
+    return files
+
+
+def generate(directory, syntax, extension=None, processes=None):
+    """
+    Returns the tags of all the files in the wiki directory, sorted by the
+    tag name, as vim expects in a tags file.
+    """
+
+    extension = extension or DEFAULT_EXTENSION[syntax]
+    jobs = [
+        (os.path.join(directory, filename), filename, syntax)
+        for filename in wiki_files(directory, extension)
+    ]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+        if len(jobs) < POOL_THRESHOLD:
+            processes = 1
+
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(process_file, jobs, chunksize=16)
+    else:
+        results = map(process_file, jobs)
+
+    tags = [tag for result in results for tag in result]
+
+    # Sort by bytes as vim does, the order of the tags of the same name is
+    # kept
+    tags.sort(key=lambda tag: tag.split('\t', 1)[0].encode('utf-8'))
+    return tags
+
+
+def write_tags(tags, output):
+    """
+    Writes the tags file, replacing the previous one at once, so that vim
+    never reads a partial file.
+    """
+
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.tags')
 
-    file_content = []
     try:
-        with open(filename, "r") as vim_buffer:
-            file_content = vim_buffer.readlines()
-    except:
+        with os.fdopen(fd, 'w') as f:
+            f.write('!_TAG_FILE_FORMAT\t2\t/extended format/\n')
+            f.write('!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted/\n')
+            for tag in tags:
+                f.write(tag + '\n')
+        os.replace(temporary, output)
+    except Exception:
+        os.remove(temporary)
+        raise
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('syntax', choices=sorted(HEADER_START))
+    parser.add_argument('filename', nargs='?')
+    parser.add_argument('--wiki')
+    parser.add_argument('--extension')
+    parser.add_argument('--output')
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args(argv)
+
+    if args.wiki:
+        tags = generate(args.wiki, args.syntax, args.extension, args.processes)
+        write_tags(tags, args.output or os.path.join(args.wiki, 'tags'))
+    elif args.filename:
+        for output in process_file((args.filename, args.filename, args.syntax)):
+            print(output)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
         exit()
 
-    for output in process(file_content, filename, syntax):
-        print(output)
+    main(sys.argv[1:])
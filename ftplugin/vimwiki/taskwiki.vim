@@ -21,19 +21,14 @@ if exists("g:taskwiki_disable")
   finish
 endif
 
-if !exists("g:did_python_taskwiki")
-  " Determine the plugin path
-  let s:plugin_path = escape(expand('<sfile>:p:h:h:h'), '\')
-
-  " Execute the main body of taskwiki source
-  execute g:taskwiki_pyfile . s:plugin_path . '/taskwiki/main.py'
-
-  let g:did_python_taskwiki = 1
-endif
+" The python part of taskwiki is loaded by the first command which needs it,
+" so that opening a vimwiki buffer is not delayed by it
+let s:init = 'call taskwiki#Init() | '
+let s:py = s:init . g:taskwiki_py
 
 " Global update commands
-execute "command! -buffer -nargs=* TaskWikiBufferSave :"      . g:taskwiki_py . "WholeBuffer.update_to_tw()"
-execute "command! -buffer -nargs=* TaskWikiBufferLoad :"      . g:taskwiki_py . "WholeBuffer.update_from_tw()"
+execute "command! -buffer -nargs=* TaskWikiBufferSave :"      . s:py . "WholeBuffer.update_to_tw()"
+execute "command! -buffer -nargs=* TaskWikiBufferLoad :"      . s:py . "WholeBuffer.update_from_tw()"
 
 augroup taskwiki
     autocmd! * <buffer>
@@ -45,7 +40,7 @@ augroup taskwiki
       autocmd BufWinEnter <buffer> call taskwiki#LoadView()
     endif
     " Reset cache when switching buffers
-    execute "autocmd BufEnter <buffer> :" . g:taskwiki_py . "cache.load_current().reset()"
+    autocmd BufEnter <buffer> if exists('g:did_python_taskwiki') | execute g:taskwiki_py . 'cache.reset_current()' | endif
     " Update window-local fold options
     if !exists('g:taskwiki_dont_fold')
       autocmd BufWinEnter <buffer> call taskwiki#FoldInit()
@@ -53,48 +48,48 @@ augroup taskwiki
 
     " Refresh on load (if possible, after loadview to preserve folds)
     if has('patch-8.1.1113') || has('nvim-0.4.0')
-      autocmd BufWinEnter <buffer> ++once TaskWikiBufferLoad
+      autocmd BufWinEnter <buffer> ++once call taskwiki#DeferLoad()
     else
       TaskWikiBufferLoad
     endif
 augroup END
 
 " Split reports commands
-execute "command! -buffer -nargs=* TaskWikiProjects :"        . g:taskwiki_py . "SplitProjects(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiProjectsSummary :" . g:taskwiki_py . "SplitSummary(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiBurndownDaily :"   . g:taskwiki_py . "SplitBurndownDaily(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiBurndownMonthly :" . g:taskwiki_py . "SplitBurndownMonthly(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiBurndownWeekly :"  . g:taskwiki_py . "SplitBurndownWeekly(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiCalendar :"        . g:taskwiki_py . "SplitCalendar(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiGhistoryAnnual :"  . g:taskwiki_py . "SplitGhistoryAnnual(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiGhistoryMonthly :" . g:taskwiki_py . "SplitGhistoryMonthly(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiHistoryAnnual :"   . g:taskwiki_py . "SplitHistoryAnnual(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiHistoryMonthly :"  . g:taskwiki_py . "SplitHistoryMonthly(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiStats :"           . g:taskwiki_py . "SplitStats(<q-args>).execute()"
-execute "command! -buffer -nargs=* TaskWikiTags :"            . g:taskwiki_py . "SplitTags(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiProjects :"        . s:py . "SplitProjects(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiProjectsSummary :" . s:py . "SplitSummary(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiBurndownDaily :"   . s:py . "SplitBurndownDaily(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiBurndownMonthly :" . s:py . "SplitBurndownMonthly(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiBurndownWeekly :"  . s:py . "SplitBurndownWeekly(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiCalendar :"        . s:py . "SplitCalendar(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiGhistoryAnnual :"  . s:py . "SplitGhistoryAnnual(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiGhistoryMonthly :" . s:py . "SplitGhistoryMonthly(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiHistoryAnnual :"   . s:py . "SplitHistoryAnnual(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiHistoryMonthly :"  . s:py . "SplitHistoryMonthly(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiStats :"           . s:py . "SplitStats(<q-args>).execute()"
+execute "command! -buffer -nargs=* TaskWikiTags :"            . s:py . "SplitTags(<q-args>).execute()"
 
 " Commands that operate on tasks in the buffer
-execute "command! -buffer -range TaskWikiInfo :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().info()"
-execute "command! -buffer -range TaskWikiEdit :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().edit()"
-execute "command! -buffer -range TaskWikiLink :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().link()"
-execute "command! -buffer -range TaskWikiGrid :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().grid()"
-execute "command! -buffer -range TaskWikiDelete :<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().delete()"
-execute "command! -buffer -range TaskWikiStart :<line1>,<line2>"  . g:taskwiki_py . "SelectedTasks().start()"
-execute "command! -buffer -range TaskWikiStop :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().stop()"
-execute "command! -buffer -range TaskWikiToggle :<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().toggle()"
-execute "command! -buffer -range TaskWikiDone :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().done()"
-execute "command! -buffer -range TaskWikiRedo :<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().redo()"
-
-execute "command! -buffer -range -nargs=* TaskWikiSort :<line1>,<line2>"     . g:taskwiki_py . "SelectedTasks().sort(<q-args>)"
-execute "command! -buffer -range -nargs=* TaskWikiAnnotate :<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().annotate(<q-args>)"
-execute "command! -buffer -range -nargs=* -complete=customlist,taskwiki#CompleteMod TaskWikiMod :<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().modify(<q-args>)"
+execute "command! -buffer -range TaskWikiInfo :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().info()"
+execute "command! -buffer -range TaskWikiEdit :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().edit()"
+execute "command! -buffer -range TaskWikiLink :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().link()"
+execute "command! -buffer -range TaskWikiGrid :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().grid()"
+execute "command! -buffer -range TaskWikiDelete :" . s:init . "<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().delete()"
+execute "command! -buffer -range TaskWikiStart :" . s:init . "<line1>,<line2>"  . g:taskwiki_py . "SelectedTasks().start()"
+execute "command! -buffer -range TaskWikiStop :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().stop()"
+execute "command! -buffer -range TaskWikiToggle :" . s:init . "<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().toggle()"
+execute "command! -buffer -range TaskWikiDone :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().done()"
+execute "command! -buffer -range TaskWikiRedo :" . s:init . "<line1>,<line2>"   . g:taskwiki_py . "SelectedTasks().redo()"
+
+execute "command! -buffer -range -nargs=* TaskWikiSort :" . s:init . "<line1>,<line2>"     . g:taskwiki_py . "SelectedTasks().sort(<q-args>)"
+execute "command! -buffer -range -nargs=* TaskWikiAnnotate :" . s:init . "<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().annotate(<q-args>)"
+execute "command! -buffer -range -nargs=* -complete=customlist,taskwiki#CompleteMod TaskWikiMod :" . s:init . "<line1>,<line2>" . g:taskwiki_py . "SelectedTasks().modify(<q-args>)"
 
 " Interactive commands
-execute "command! -buffer -range TaskWikiChooseProject :<line1>,<line2>"     . g:taskwiki_py . "ChooseSplitProjects('global').execute()"
-execute "command! -buffer -range TaskWikiChooseTag :<line1>,<line2>"         . g:taskwiki_py . "ChooseSplitTags('global').execute()"
+execute "command! -buffer -range TaskWikiChooseProject :" . s:init . "<line1>,<line2>"     . g:taskwiki_py . "ChooseSplitProjects('global').execute()"
+execute "command! -buffer -range TaskWikiChooseTag :" . s:init . "<line1>,<line2>"         . g:taskwiki_py . "ChooseSplitTags('global').execute()"
 
 " Meta commands
-execute "command! -buffer TaskWikiInspect :" . g:taskwiki_py . "Meta().inspect_viewport()"
+execute "command! -buffer TaskWikiInspect :" . s:py . "Meta().inspect_viewport()"
 
 if !exists('g:taskwiki_suppress_mappings')
   " Disable <CR> as VimwikiFollowLink
@@ -102,7 +97,7 @@ if !exists('g:taskwiki_suppress_mappings')
     nmap <Plug>NoVimwikiFollowLink <Plug>VimwikiFollowLink
   endif
 
-  execute "nnoremap <silent><buffer> <CR> :" . g:taskwiki_py . "Mappings.task_info_or_vimwiki_follow_link()<CR>"
+  execute "nnoremap <silent><buffer> <CR> :call taskwiki#Init()<Bar>" . g:taskwiki_py . "Mappings.task_info_or_vimwiki_follow_link()<CR>"
 
   " Leader-related mappings. Mostly <Leader>t + <first letter of the action>
   if exists('g:taskwiki_maplocalleader')
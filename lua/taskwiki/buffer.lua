@@ -0,0 +1,107 @@
+-- Tracks the lines changed in the buffers under neovim, so that taskwiki
+-- needs to transfer only the lines changed since it obtained the buffer
+-- content the last time, instead of the whole buffer.
+
+local M = {}
+
+-- Region changed since the last fetch, for each attached buffer. The region
+-- spans from first to last in the current content, delta is the difference
+-- in the number of lines, so that it spans to last - delta in the content
+-- at the last fetch.
+local regions = {}
+
+local function on_lines(_, bufnr, _, first, last_old, last_new)
+  local region = regions[bufnr]
+
+  -- Returning true detaches from the buffer
+  if region == nil then
+    return true
+  end
+
+  local delta = last_new - last_old
+
+  if region.first == nil then
+    region.first = first
+    region.last = last_new
+  else
+    -- Lines after the edit are shifted, the region ends with the edit
+    -- otherwise
+    if region.last > last_old then
+      region.last = region.last + delta
+    else
+      region.last = last_new
+    end
+    region.first = math.min(region.first, first)
+  end
+
+  region.delta = region.delta + delta
+end
+
+local function on_reload(_, bufnr)
+  if regions[bufnr] ~= nil then
+    regions[bufnr].full = true
+  end
+end
+
+local function on_detach(_, bufnr)
+  regions[bufnr] = nil
+end
+
+local function attach(bufnr)
+  regions[bufnr] = {delta = 0, full = true}
+
+  local attached = vim.api.nvim_buf_attach(bufnr, false, {
+    on_lines = on_lines,
+    on_reload = on_reload,
+    on_detach = on_detach,
+  })
+
+  if not attached then
+    regions[bufnr] = nil
+  end
+end
+
+-- Returns the lines changed since the last fetch. Unless known is set, or
+-- the changes were not tracked, the whole buffer content is returned.
+function M.fetch(bufnr, known)
+  if regions[bufnr] == nil then
+    attach(bufnr)
+  end
+
+  local region = regions[bufnr] or {delta = 0, full = true}
+  local result
+
+  if region.full or not known then
+    result = {
+      full = true,
+      lines = vim.api.nvim_buf_get_lines(bufnr, 0, -1, false),
+    }
+  elseif region.first == nil then
+    result = {full = false, first = 0, old_last = 0, lines = {}}
+  else
+    result = {
+      full = false,
+      first = region.first,
+      old_last = region.last - region.delta,
+      lines = vim.api.nvim_buf_get_lines(bufnr, region.first, region.last, false),
+    }
+  end
+
+  region.first = nil
+  region.last = nil
+  region.delta = 0
+  region.full = false
+
+  return result
+end
+
+-- Replaces the given ranges of lines, as {start, end, lines} triples
+-- ordered from the top of the buffer.
+function M.set_lines(bufnr, hunks)
+  for i = #hunks, 1, -1 do
+    local hunk = hunks[i]
+    vim.api.nvim_buf_set_lines(bufnr, hunk[1], hunk[2], false, hunk[3])
+  end
+end
+
+return M
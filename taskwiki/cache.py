@@ -1,9 +1,16 @@
 import vim  # pylint: disable=F0401
+import collections
+import concurrent.futures
 import re
 import six
+import sys
+import threading
+import time
 
+from taskwiki import constants
+from taskwiki import nvim
+from taskwiki import outline
 from taskwiki import preset
-from taskwiki import viewport
 from taskwiki import regexp
 from taskwiki import store
 from taskwiki import short
@@ -17,17 +24,71 @@ class BufferProxy(object):
         self.data = []
         self.buffer_number = number
 
+        # Blocks of lines that were not changed by the last obtain
+        self.unchanged_blocks = []
+
+        # Buffer content at the last fetch, neovim reports the changes since
+        self.remote = None
+
+    def fetch(self):
+        """
+        Returns the current content of the buffer.
+        """
+
+        if nvim.ENABLED:
+            self.remote = nvim.fetch(self.buffer_number, self.remote)
+            return list(self.remote)
+
+        return util.get_buffer(self.buffer_number)[:]
+
     def obtain(self):
-        self.data = util.get_buffer(self.buffer_number)[:]
+        old_data = self.data
+        self.data = self.fetch()
+        self.unchanged_blocks = util.unchanged_line_blocks(old_data, self.data)
 
     def push(self):
         with util.current_line_preserved():
+            hunks = util.changed_line_hunks(self.fetch(), self.data)
+
+            if not hunks:
+                return
+
+            # Only set the lines that changed. Avoids extra undo events with
+            # empty diff and keeps the undo entry and redraw proportional to
+            # the change. Go bottom up, so that the positions stay valid.
             buffer = util.get_buffer(self.buffer_number)
-            # Only set the buffer contents if the data is changed.
-            # Avoids extra undo events with empty diff.
-            if buffer[:] != self.data:
-                buffer[:] = self.data
-                buffer.options['modified'] = True
+
+            if nvim.ENABLED:
+                nvim.set_lines(self.buffer_number, [
+                    (old_start, old_end, self.data[new_start:new_end])
+                    for old_start, old_end, new_start, new_end in hunks
+                ])
+            else:
+                for old_start, old_end, new_start, new_end in reversed(hunks):
+                    buffer[old_start:old_end] = self.data[new_start:new_end]
+
+            buffer.options['modified'] = True
+
+    def push_changes(self, base):
+        """
+        Pushes the lines that differ from base into the buffer, which may
+        have been edited since base was obtained. Lines that were edited
+        in the buffer in the meantime are left untouched.
+        """
+
+        buffer = util.get_buffer(self.buffer_number)
+        current = buffer[:]
+        modified = False
+
+        for old_start, new_start, size in util.unchanged_line_blocks(base, current):
+            for offset in range(size):
+                line = self.data[old_start + offset]
+                if line != base[old_start + offset]:
+                    buffer[new_start + offset] = line
+                    modified = True
+
+        if modified:
+            buffer.options['modified'] = True
 
     def __getitem__(self, index):
         try:
@@ -67,6 +128,9 @@ class CacheRegistry(object):
         # Remember current cache
         self.current_buffer = None
 
+        # The dependencies are shared by all the buffers, check them once
+        self.dependencies_checked = False
+
     def __call__(self, buffer_number = None):
         """
         Get cache for given buffer_number or the one which was accessed most recently.
@@ -74,8 +138,12 @@ class CacheRegistry(object):
 
         if buffer_number is None:
             buffer_number = self.current_buffer
-        else:
-            self.current_buffer = buffer_number
+
+        # No buffer was accessed yet, the cache is being loaded lazily
+        if buffer_number is None:
+            buffer_number = vim.current.buffer.number
+
+        self.current_buffer = buffer_number
 
         try:
             # Use existing cache if it was loaded before
@@ -91,13 +159,83 @@ class CacheRegistry(object):
         self.caches[buffer_number] = cache
 
         # Check the necessary dependencies
-        util.enforce_dependencies(cache)
+        if not self.dependencies_checked:
+            util.enforce_dependencies(cache)
+            self.dependencies_checked = True
 
         return cache
 
     def load_current(self):
         return self(vim.current.buffer.number)
 
+    def reset_current(self):
+        """
+        Resets the cache of the current buffer, if it was loaded already.
+        """
+
+        buffer_number = vim.current.buffer.number
+        self.current_buffer = buffer_number
+
+        if buffer_number in self.caches:
+            self.caches[buffer_number].reset()
+
+    def check_versions(self):
+        """
+        Starts obtaining the versions of the task binaries in the background.
+        The first cache load waits for them, if they are not obtained yet.
+        """
+
+        store.check_version('task')
+        for definition in util.get_var('taskwiki_extra_warriors', {}).values():
+            store.check_version(definition.get('task_command', 'task'))
+
+    def wait_for_saves(self):
+        """
+        Blocks until all the background saves are finished.
+        """
+
+        for cache in self.caches.values():
+            if cache.save_job is not None:
+                cache.save_job.thread.join()
+
+
+class BackgroundSave(object):
+    """
+    Saves the tasks of the cache into TaskWarrior in a separate thread.
+
+    The thread must not access vim at all, hence the buffer is parsed before
+    the save is started and updated only after it is finished, by the main
+    thread.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.error = None
+
+        # Content of the buffer the tasks were parsed from
+        self.base = list(cache.buffer.data)
+
+        # Resolve the tasks here, since loading them reads the vim variables
+        # and reports the stale UUIDs in vim. The thread then finds them all
+        # in the cache.
+        for vwtask in cache.vwtask.values():
+            vwtask.task
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def run(self):
+        try:
+            self.cache.save_tasks()
+        except Exception:
+            self.error = sys.exc_info()
+
+    def start(self):
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
 
 class TaskCache(object):
     """
@@ -110,7 +248,7 @@ class TaskCache(object):
         default_rc = util.get_var('taskwiki_taskrc_location') or '~/.taskrc'
         default_data = util.get_var('taskwiki_data_location') or None
         extra_warrior_defs = util.get_var('taskwiki_extra_warriors', {})
-        markup_syntax = vim.eval("vimwiki#vars#get_wikilocal('syntax')") or 'default'
+        markup_syntax = util.get_markup_syntax()
 
         # Validate markup choice and set it
         if markup_syntax in ["default", "markdown"]:
@@ -127,32 +265,79 @@ class TaskCache(object):
         self.vwtask = store.VwtaskStore(self)
         self.viewport = store.ViewportStore(self)
         self.line = store.LineStore(self)
+        self.outline = outline.Outline(self)
+        self.relevant_warriors = dict()
+        self.snapshot = store.SnapshotStore(self)
         self.warriors = store.WarriorStore(default_rc, default_data, extra_warrior_defs)
         self.buffer_has_authority = True
+        self.timings = dict()
+        self.save_job = None
 
     @property
     def vimwikitask_dependency_order(self):
-        iterated_cache = {
-            k:v for k,v in self.vwtask.items()
-            if v is not None
-        }
+        """
+        Yields the tasks in the buffer in such order that each task comes
+        after all the tasks it depends on.
+        """
 
-        while iterated_cache.keys():
-            for key in list(iterated_cache.keys()):
-                task = iterated_cache[key]
-                if all([t['line_number'] not in iterated_cache.keys()
-                        for t in task.add_dependencies]):
-                    del iterated_cache[key]
-                    yield task
+        vwtasks = dict(
+            (line, vwtask) for line, vwtask in self.vwtask.items()
+            if vwtask is not None
+        )
+
+        # Count the unresolved dependencies of each task and remember
+        # the reverse edges, to be able to resolve them
+        unresolved = dict()
+        dependants = dict()
+
+        for line, vwtask in vwtasks.items():
+            dependencies = set(
+                dependency['line_number'] for dependency in vwtask.add_dependencies
+                if dependency['line_number'] in vwtasks
+            )
+
+            unresolved[line] = len(dependencies)
+            for dependency in dependencies:
+                dependants.setdefault(dependency, []).append(line)
+
+        ready = collections.deque(
+            line for line in vwtasks if not unresolved[line]
+        )
+
+        while ready:
+            line = ready.popleft()
+            yield vwtasks[line]
+
+            for dependant in dependants.get(line, []):
+                unresolved[dependant] -= 1
+                if not unresolved[dependant]:
+                    ready.append(dependant)
+
+        cyclic = sorted(line for line, count in unresolved.items() if count)
+        if cyclic:
+            raise errors.TaskWikiException(
+                "Tasks on lines {0} have cyclic dependencies.".format(
+                    ', '.join(str(line + 1) for line in cyclic)
+                )
+            )
 
     def reset(self):
+        # The stores are in use by the background save, if any
+        self.complete_save()
+
         self.buffer.obtain()
         self.completion.store = dict()
         self.task.store = dict()
         self.presets.store = dict()
-        self.vwtask.store = dict()
+        self.vwtask.clear()
         self.viewport.store = dict()
-        self.line.store = dict()
+        self.snapshot.store = dict()
+        self.relevant_warriors = dict()
+
+        # Parsed lines depend only on the line content, hence the lines that
+        # were not edited since the last sync need not be parsed again
+        self.line.retain(self.buffer.unchanged_blocks)
+        self.outline.reset()
 
     def load_presets(self):
         stack = []
@@ -185,28 +370,84 @@ class TaskCache(object):
 
     def load_viewports(self):
         for i in range(len(self.buffer)):
-            port = viewport.ViewPort.from_line(i, self)
-
-            if port is None:
-                continue
+            # Loads the viewport into the cache
+            port = self.viewport[i]
 
-            port.load_tasks()
-
-            # Save the viewport in the cache
-            self.viewport[i] = port
+            if port is not None:
+                port.load_tasks()
 
     def update_vwtasks_in_buffer(self):
         for task in self.vwtask.values():
             task.update_in_buffer()
 
     def save_tasks(self):
-        for task in self.vimwikitask_dependency_order:
-            task.save_to_tw()
+        vwtasks = list(self.vimwikitask_dependency_order)
+        imported = [vwtask for vwtask in vwtasks if vwtask.importable]
+
+        # New tasks are created by a single import per TaskWarrior instance,
+        # which requires them to have their UUIDs assigned upfront, so that
+        # they can reference each other as dependencies
+        for vwtask in imported:
+            util.assign_uuid(vwtask.task)
+
+        tasks_by_tw = dict()
+        for vwtask in imported:
+            vwtask.update_dependencies()
+            tasks_by_tw.setdefault(vwtask.tw, []).append(vwtask.task)
+
+        for tw, tasks in tasks_by_tw.items():
+            util.tw_import(tw, tasks)
+
+        for vwtask in imported:
+            vwtask.update_after_save()
+
+        # The remaining tasks can depend on the imported ones, hence are
+        # saved only after the import
+        imported = set(imported)
+        for vwtask in vwtasks:
+            if vwtask not in imported:
+                vwtask.save_to_tw()
+
+        # Exported tasks are outdated after the changes
+        self.snapshot.clear()
+
+    def save_tasks_in_background(self):
+        self.save_job = BackgroundSave(self)
+        self.save_job.start()
+
+    def complete_save(self):
+        """
+        Waits for the background save to finish, if there is one, and updates
+        the buffer with its results.
+        """
+
+        job, self.save_job = self.save_job, None
+
+        if job is None:
+            return
+
+        job.thread.join()
+
+        if job.error is not None:
+            six.reraise(*job.error)
+
+        self.update_vwtasks_in_buffer()
+
+        if util.get_buffer(self.buffer.buffer_number)[:] == job.base:
+            self.evaluate_viewports()
+            self.buffer.push()
+        else:
+            # The buffer was edited during the save, update only the task
+            # lines that were not touched and leave the viewports for the
+            # next save
+            self.buffer.push_changes(job.base)
+            self.reset()
 
     def load_tasks(self):
-        raw_task_info = []
+        start = time.time()
+        uuids_by_tw = dict()
 
-        # Load the tasks in batch, all in given TaskWarrior instance
+        # Collect the UUIDs of the tasks in the buffer, per TaskWarrior instance
         for line in self.buffer:
             match = re.search(regexp.GENERIC_TASK, line)
             if not match:
@@ -218,25 +459,68 @@ class TaskCache(object):
             if not uuid:
                 continue
 
-            raw_task_info.append((uuid, tw))
-
-        for tw in self.warriors.values():
-            # Select all tasks in the files that have UUIDs
-            uuids = [uuid for uuid, task_tw in raw_task_info if task_tw == tw]
-
-            # If no task in the file contains UUID, we have no job here
-            if not uuids:
-                continue
+            # Dict keeps the order of the UUIDs, dropping the duplicates
+            uuids_by_tw.setdefault(tw, dict())[uuid] = None
+
+        # Obtaining the snapshots reads the vim variables and the TaskWarrior
+        # configuration, which is not safe off the main thread. The workers
+        # below only run the exports.
+        snapshots = dict((tw, self.snapshot[tw]) for tw in uuids_by_tw)
+
+        def load_from_warrior(item):
+            tw, uuids = item[0], list(item[1])
+            tasks = []
+
+            # Pick the tasks from the complete snapshot, if available
+            snapshot = snapshots[tw]
+            if snapshot is not None and snapshot.complete:
+                tasks = [snapshot.get(uuid) for uuid in uuids]
+                return tw, [task for task in tasks if task is not None]
+
+            # Query the tasks in chunks, so that the command line stays
+            # bounded even for very large buffers
+            for i in range(0, len(uuids), constants.UUID_CHUNK_SIZE):
+                chunk = uuids[i:i + constants.UUID_CHUNK_SIZE]
+                tasks += [task for _, task in util.tw_export(tw, chunk)]
+
+            return tw, tasks
+
+        # The TaskWarrior instances do not share the data, hence can be
+        # queried in parallel. Chunks of one instance are queried in sequence,
+        # since concurrent commands could race on garbage collection or
+        # generation of the recurrent tasks.
+        if len(uuids_by_tw) > 1:
+            with concurrent.futures.ThreadPoolExecutor(len(uuids_by_tw)) as executor:
+                results = list(executor.map(load_from_warrior, uuids_by_tw.items()))
+        else:
+            results = [load_from_warrior(item) for item in uuids_by_tw.items()]
+
+        # Update the cache in one go
+        self.task.store.update({
+            short.ShortUUID(task['uuid'], tw): task
+            for tw, tasks in results
+            for task in tasks
+        })
+
+        self.record_timing(
+            'load_tasks',
+            sum(len(uuids) for uuids in uuids_by_tw.values()),
+            time.time() - start
+        )
+
+    def record_timing(self, operation, count, seconds):
+        """
+        Remember how long the given operation took for this buffer, and how
+        many items were processed. Exposed as b:taskwiki_timings in vim.
+        """
 
-            # Get them out of TaskWarrior at once
-            tasks = tw.tasks.filter()
-            for uuid in uuids:
-                tasks = tasks.filter(uuid=uuid)
+        self.timings[operation] = {
+            'count': count,
+            'milliseconds': int(seconds * 1000),
+        }
 
-            # Update each task in the cache
-            for task in tasks:
-                key = short.ShortUUID(task['uuid'], tw)
-                self.task[key] = task
+        buffer = util.get_buffer(self.buffer.buffer_number)
+        buffer.vars['taskwiki_timings'] = self.timings
 
     def update_vwtasks_from_tasks(self):
         for vwtask in self.vwtask.values():
@@ -274,6 +558,7 @@ class TaskCache(object):
 
         # Shift lines in the line cache
         self.line.shift(position, 1)
+        self.outline.reset()
 
     def remove_line(self, position):
         # Remove the line
@@ -292,6 +577,7 @@ class TaskCache(object):
 
         # Shift lines in the line cache
         self.line.shift(position, -1)
+        self.outline.reset()
 
     def swap_lines(self, position1, position2):
         buffer_size = len(self.buffer)
@@ -304,12 +590,42 @@ class TaskCache(object):
         # Swap both the viewport and vimwikitasks indexes
         self.vwtask.swap(position1, position2)
         self.viewport.swap(position1, position2)
+        self.outline.reset()
+
+    def reorder_lines(self, position, old_positions):
+        """
+        Reorders the block of lines starting at the given position, so that
+        the line at old_positions[i] ends up at position + i.
+        """
+
+        end = position + len(old_positions)
+        self.buffer[position:end] = [self.buffer[i] for i in old_positions]
+
+        self.line.reorder(position, old_positions)
+        self.vwtask.reorder(position, old_positions)
+        self.viewport.reorder(position, old_positions)
+        self.outline.reset()
 
     def get_relevant_tw(self):
-        # Find closest task
+        # The closest task determines the TaskWarrior instance. Its source is
+        # read from the parsed line, there is no need to construct the task.
         from taskwiki import vwtask
-        task = vwtask.VimwikiTask.find_closest(self)
-        return task.tw if task else self.warriors['default']
+
+        changedtick = vim.eval(
+            'getbufvar({0}, "changedtick")'.format(self.buffer.buffer_number))
+        key = (changedtick, util.get_current_line_number())
+
+        if key not in self.relevant_warriors:
+            line = outline.closest(self.outline.task_lines, key[1])
+            match = self.line[(vwtask.VimwikiTask, line)] if line is not None else None
+            source = (match.group('source') if match else None) or 'default'
+            self.relevant_warriors[key] = self.warriors[source]
+
+        return self.relevant_warriors[key]
 
     def get_relevant_completion(self):
         return self.completion[self.get_relevant_tw()]
+
+    def warm_up_completion(self):
+        for tw in self.warriors.values():
+            self.completion[tw].warm_up()
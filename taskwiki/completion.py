@@ -1,5 +1,7 @@
 from functools import reduce, wraps
+import bisect
 import re
+import threading
 
 from tasklib import TaskWarrior
 
@@ -33,6 +35,20 @@ def cached_property(f):
     return wrapper
 
 
+def prefixed(words, prefix):
+    """
+    Returns the words of the sorted list which start with the given prefix.
+    """
+
+    start = bisect.bisect_left(words, prefix)
+    end = start
+
+    while end < len(words) and words[end].startswith(prefix):
+        end += 1
+
+    return words[start:end]
+
+
 # "must*opt" -> "must(o(p(t)?)?)?"
 def prefix_regex(s):
     must, _, opt = s.partition('*')
@@ -46,9 +62,55 @@ RE_DATE = re.compile('|'.join(
 RE_RECUR = re.compile(prefix_regex('re*cur'))
 
 
+# Completions shared by all the buffers, indexed by the TaskWarrior instance
+shared = dict()
+
+
+def get_completion(tw):
+    """
+    Returns the completion for the given TaskWarrior instance, which is
+    shared by all the buffers as long as the TaskWarrior data is unchanged.
+    """
+
+    from taskwiki import diskcache
+
+    signature = diskcache.data_signature(tw)
+    completion = shared.get(tw)
+
+    if completion is None or completion.signature != signature:
+        completion = Completion(tw, signature)
+        shared[tw] = completion
+
+    return completion
+
+
 class Completion():
-    def __init__(self, tw):
+    def __init__(self, tw, signature=None):
         self.tw = tw
+        self.signature = signature
+        self.warm_up_job = None
+
+    def warm_up(self):
+        """
+        Obtains the completion data in the background, so that the first
+        completion does not have to wait for TaskWarrior.
+        """
+
+        if self.warm_up_job is not None or '_cache__tags' in self.__dict__:
+            return
+
+        def run():
+            self._attributes()
+            self._tags()
+            self._projects()
+
+        self.warm_up_job = threading.Thread(target=run)
+        self.warm_up_job.daemon = True
+        self.warm_up_job.start()
+
+    def wait(self):
+        if self.warm_up_job is not None:
+            self.warm_up_job.join()
 
     @cached_property
     def _attributes(self):
@@ -81,39 +143,40 @@ class Completion():
         if not w.isalpha():
             return []
 
-        return [attr + ':'
-                for attr in self._attributes()
-                if attr.startswith(w)]
+        return [attr + ':' for attr in prefixed(self._attributes(), w)]
 
     def _complete_tags(self, w):
         if not w or w[0] not in ['+', '-']:
             return []
 
-        t = w[1:]
-        return [w[0] + tag
-                for tag in self._tags()
-                if tag.startswith(t)]
+        return [w[0] + tag for tag in prefixed(self._tags(), w[1:])]
 
     def _comp_words(self, w, pattern, words):
         before, sep, after = w.partition(':')
         if not sep or not re.fullmatch(pattern, before):
             return []
 
-        return [before + sep + word
-                for word in words()
-                if word.startswith(after)]
+        return [before + sep + word for word in words(after)]
 
     def _complete_projects(self, w):
-        return self._comp_words(w, RE_PROJECT, self._projects)
+        return self._comp_words(
+            w, RE_PROJECT, lambda after: prefixed(self._projects(), after))
 
     def _complete_dates(self, w):
-        return self._comp_words(w, RE_DATE, lambda: constants.COMPLETION_DATE)
+        return self._comp_words(
+            w, RE_DATE, lambda after: [
+                word for word in constants.COMPLETION_DATE
+                if word.startswith(after)])
 
     def _complete_recur(self, w):
-        return self._comp_words(w, RE_RECUR, lambda: constants.COMPLETION_RECUR)
+        return self._comp_words(
+            w, RE_RECUR, lambda after: [
+                word for word in constants.COMPLETION_RECUR
+                if word.startswith(after)])
 
     @complete_last_word
     def modify(self, w):
+        self.wait()
         return \
             self._complete_any(w) or \
             self._complete_attributes(w) or \
@@ -132,6 +195,7 @@ class Completion():
             return -1
 
     def omni_modstring(self, w):
+        self.wait()
         return \
             self._complete_any(w) or \
             self._complete_attributes(w) or \
@@ -1,6 +1,9 @@
 DEFAULT_VIEWPORT_VIRTUAL_TAGS = ("-DELETED", "-PARENT")
 DEFAULT_SORT_ORDER = "status+,end+,due+,priority-,project+"
 
+# Maximum number of UUIDs passed to a single TaskWarrior command
+UUID_CHUNK_SIZE = 500
+
 COMPLETION_DATE = """
     now
     yesterday today tomorrow
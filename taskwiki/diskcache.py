@@ -0,0 +1,166 @@
+"""
+Persists data derived from TaskWarrior on the disk, so that it can be
+reused between vim sessions.
+
+Every entry is stored along with a signature. The entry is considered
+valid only as long as the signature matches, which is typically derived
+from the modification times of the TaskWarrior data files.
+"""
+
+import hashlib
+import json
+import os
+
+from taskwiki import util
+
+# Files whose changes mean the TaskWarrior data has changed. Covers both
+# the file based storage and the TaskChampion database.
+DATA_FILES = (
+    'pending.data',
+    'completed.data',
+    'backlog.data',
+    'undo.data',
+    'taskchampion.sqlite3',
+    'taskchampion.sqlite3-wal',
+)
+
+# Entries already read from the disk in this session, indexed by path
+loaded = dict()
+
+
+def get_location():
+    location = util.get_var('taskwiki_cache_location')
+    return os.path.expanduser(location) if location else None
+
+
+def enabled():
+    return get_location() is not None
+
+
+def data_location(tw):
+    location = (
+        tw.overrides.get('data.location') or
+        tw.config.get('data.location') or
+        '~/.task'
+    )
+    return os.path.expanduser(location)
+
+
+def file_signature(paths):
+    """
+    Returns a signature of the given files, which changes whenever any of the
+    files is modified, created or removed.
+    """
+
+    signature = []
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        signature.append([path, stat.st_mtime_ns, stat.st_size])
+
+    return signature
+
+
+def data_signature(tw):
+    location = data_location(tw)
+    return file_signature(os.path.join(location, name) for name in DATA_FILES)
+
+
+def taskrc_location(tw):
+    location = (
+        tw.taskrc_location or
+        os.environ.get('TASKRC') or
+        '~/.taskrc'
+    )
+    return os.path.expanduser(location)
+
+
+def taskrc_files(path, found=None):
+    """
+    Returns the path of the taskrc file along with the paths of all the files
+    it includes, recursively.
+    """
+
+    found = found if found is not None else []
+
+    if path in found:
+        return found
+
+    found.append(path)
+
+    try:
+        with open(path, 'r') as f:
+            lines = f.readlines()
+    except (IOError, OSError, UnicodeDecodeError):
+        return found
+
+    for line in lines:
+        parts = line.split(None, 1)
+        if len(parts) != 2 or parts[0] != 'include':
+            continue
+
+        # Relative includes are resolved against the directory of the file
+        include = os.path.expanduser(parts[1].strip())
+        include = os.path.join(os.path.dirname(path), include)
+        taskrc_files(os.path.normpath(include), found)
+
+    return found
+
+
+def config_signature(tw):
+    return file_signature(taskrc_files(taskrc_location(tw)))
+
+
+def entry_path(kind, key):
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_location(), '{0}-{1}.json'.format(kind, digest))
+
+
+def load(kind, key, signature):
+    """
+    Returns the payload stored for the given kind and key, or None if there
+    is no such entry or its signature does not match.
+    """
+
+    path = entry_path(kind, key)
+    entry = loaded.get(path)
+
+    if entry is None:
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        loaded[path] = entry
+
+    if entry.get('key') != key or entry.get('signature') != signature:
+        return None
+
+    return entry.get('payload')
+
+
+def save(kind, key, signature, payload):
+    path = entry_path(kind, key)
+    entry = {'key': key, 'signature': signature, 'payload': payload}
+    loaded[path] = entry
+
+    # Write into a temporary file first, so that other vim instances never
+    # read a partially written entry
+    temporary_path = '{0}.{1}.tmp'.format(path, os.getpid())
+
+    try:
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(temporary_path, 'w') as f:
+            json.dump(entry, f, separators=(',', ':'))
+
+        os.replace(temporary_path, path)
+    except (IOError, OSError):
+        # Failing to persist the entry is not fatal, it only costs time
+        pass
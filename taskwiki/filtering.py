@@ -0,0 +1,412 @@
+"""
+Evaluates TaskWarrior filters against exported task data in Python.
+
+Only a subset of the TaskWarrior filter syntax is understood. Whenever a
+filter contains anything else, UnsupportedFilter is raised and the caller
+is expected to let TaskWarrior do the filtering instead.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+# Format of the timestamps in the TaskWarrior export
+EXPORT_DATE_FORMAT = '%Y%m%dT%H%M%SZ'
+
+# Attributes that are plain strings in the export
+STRING_ATTRIBUTES = ('description', 'priority', 'project', 'status')
+
+# Attributes that hold timestamps in the export
+DATE_ATTRIBUTES = ('due', 'end', 'entry', 'modified', 'scheduled', 'start',
+                   'until', 'wait')
+
+# Modifiers, grouped by their meaning
+MODIFIER_ALIASES = {
+    'is': 'is', 'equals': 'is',
+    'isnt': 'isnt',
+    'not': 'not',
+    'has': 'has', 'contains': 'has',
+    'hasnt': 'hasnt',
+    'startswith': 'startswith', 'left': 'startswith',
+    'endswith': 'endswith', 'right': 'endswith',
+    'before': 'before', 'below': 'before', 'under': 'before',
+    'after': 'after', 'above': 'after', 'over': 'after',
+    'by': 'by',
+    'none': 'none',
+    'any': 'any',
+}
+
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+ISO_DATETIME = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2})?$')
+
+# Characters with a special meaning in the regular expressions TaskWarrior
+# matches the has, startswith and endswith modifiers with
+REGEX_METACHARACTERS = re.compile(r'[.^$*+?()\[\]{}|\\]')
+
+
+class UnsupportedFilter(Exception):
+    """Raised when the filter cannot be evaluated by taskwiki itself."""
+    pass
+
+
+def to_export_format(dt):
+    """
+    Converts a naive local datetime to the UTC timestamp used in the export.
+    """
+
+    return dt.astimezone(timezone.utc).strftime(EXPORT_DATE_FORMAT)
+
+
+def now_string():
+    return datetime.now(timezone.utc).strftime(EXPORT_DATE_FORMAT)
+
+
+def start_of_day(days=0):
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return to_export_format(midnight + timedelta(days=days))
+
+
+def parse_date(value):
+    """
+    Converts a date value from the filter into the export format. Returns
+    a tuple (start, end) of the interval the value denotes. The interval of
+    a point in time has zero length.
+    """
+
+    named_days = {'yesterday': -1, 'today': 0, 'sod': 0, 'tomorrow': 1}
+
+    if value == 'now':
+        now = now_string()
+        return now, now
+    elif value in named_days:
+        offset = named_days[value]
+        return start_of_day(offset), start_of_day(offset + 1)
+    elif value == 'eod':
+        end = start_of_day(1)
+        return end, end
+    elif ISO_DATE.match(value):
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return to_export_format(day), to_export_format(day + timedelta(days=1))
+    elif ISO_DATETIME.match(value):
+        fmt = '%Y-%m-%dT%H:%M:%S' if value.count(':') == 2 else '%Y-%m-%dT%H:%M'
+        point = to_export_format(datetime.strptime(value, fmt))
+        return point, point
+    else:
+        raise UnsupportedFilter("Unsupported date: {0}".format(value))
+
+
+def day_of(point):
+    """
+    Returns the interval of the local day containing the given point in
+    time, in the export format.
+    """
+
+    moment = datetime.strptime(point, EXPORT_DATE_FORMAT)
+    moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return to_export_format(midnight), to_export_format(midnight + timedelta(days=1))
+
+
+def is_waiting(task):
+    wait = task.get('wait')
+    return task.get('status') == 'waiting' or bool(wait and wait > now_string())
+
+
+def is_pending(task):
+    return task.get('status') in ('pending', 'waiting')
+
+
+def is_due_on(days):
+    def has_tag(task):
+        due = task.get('due')
+        return bool(
+            is_pending(task) and due and
+            start_of_day(days) <= due < start_of_day(days + 1)
+        )
+    return has_tag
+
+
+VIRTUAL_TAGS = {
+    'ACTIVE': lambda task: is_pending(task) and 'start' in task,
+    'ANNOTATED': lambda task: bool(task.get('annotations')),
+    'CHILD': lambda task: 'parent' in task,
+    'COMPLETED': lambda task: task.get('status') == 'completed',
+    'DELETED': lambda task: task.get('status') == 'deleted',
+    'INSTANCE': lambda task: 'parent' in task,
+    'OVERDUE': lambda task: bool(
+        is_pending(task) and task.get('due') and task['due'] < now_string()),
+    'PARENT': lambda task: task.get('status') == 'recurring' or 'mask' in task,
+    'PENDING': lambda task: task.get('status') == 'pending',
+    'PRIORITY': lambda task: bool(task.get('priority')),
+    'PROJECT': lambda task: bool(task.get('project')),
+    'SCHEDULED': lambda task: bool(task.get('scheduled')),
+    'TAGGED': lambda task: bool(task.get('tags')),
+    'TEMPLATE': lambda task: task.get('status') == 'recurring' or 'mask' in task,
+    'TODAY': is_due_on(0),
+    'DUETODAY': is_due_on(0),
+    'TOMORROW': is_due_on(1),
+    'UNTIL': lambda task: bool(task.get('until')),
+    'WAITING': is_waiting,
+    'YESTERDAY': is_due_on(-1),
+}
+
+
+def compile_tag(token):
+    sign, tag = token[0], token[1:]
+
+    if not tag:
+        raise UnsupportedFilter(token)
+
+    if tag.isupper():
+        # Uppercase tags are assumed to be virtual, unknown ones are left
+        # for TaskWarrior to interpret
+        if tag not in VIRTUAL_TAGS:
+            raise UnsupportedFilter(token)
+        has_tag = VIRTUAL_TAGS[tag]
+    else:
+        has_tag = lambda task: tag in (task.get('tags') or [])
+
+    if sign == '+':
+        return has_tag
+    else:
+        return lambda task: not has_tag(task)
+
+
+def compile_string_attribute(key, modifier, value):
+    get = lambda task: task.get(key) or ''
+
+    # TaskWarrior evaluates these modifiers as regular expressions, only
+    # the values matching literally are evaluated here
+    if modifier in ('has', 'hasnt', 'startswith', 'endswith'):
+        if REGEX_METACHARACTERS.search(value):
+            raise UnsupportedFilter("{0}.{1}:{2}".format(key, modifier, value))
+
+    if modifier is None:
+        # TaskWarrior matches the value against the beginning of the attribute
+        return lambda task: get(task).startswith(value)
+    elif modifier == 'not':
+        # Negation of the match without modifier, not exact inequality
+        return lambda task: not get(task).startswith(value)
+    elif modifier == 'is':
+        return lambda task: get(task) == value
+    elif modifier == 'isnt':
+        return lambda task: get(task) != value
+    elif modifier == 'has':
+        return lambda task: value in get(task)
+    elif modifier == 'hasnt':
+        return lambda task: value not in get(task)
+    elif modifier == 'startswith':
+        return lambda task: get(task).startswith(value)
+    elif modifier == 'endswith':
+        return lambda task: get(task).endswith(value)
+    else:
+        raise UnsupportedFilter("{0}.{1}".format(key, modifier))
+
+
+def compile_date_attribute(key, modifier, value):
+    start, end = parse_date(value)
+
+    if modifier is None:
+        # TaskWarrior compares the dates by the day, a point in time matches
+        # the whole day containing it. Versions differ in whether eod is the
+        # last second of the day or the next midnight, hence in its day.
+        if value == 'eod':
+            raise UnsupportedFilter("{0}:{1}".format(key, value))
+        if start == end:
+            start, end = day_of(start)
+        return lambda task: bool(task.get(key) and start <= task[key] < end)
+    elif modifier == 'before':
+        return lambda task: bool(task.get(key) and task[key] < start)
+    elif modifier == 'after':
+        return lambda task: bool(task.get(key) and task[key] > start)
+    elif modifier == 'by':
+        return lambda task: bool(task.get(key) and task[key] <= start)
+    else:
+        raise UnsupportedFilter("{0}.{1}".format(key, modifier))
+
+
+def compile_attribute(token):
+    attribute, value = token.split(':', 1)
+    key, _, modifier = attribute.partition('.')
+
+    if modifier:
+        if modifier not in MODIFIER_ALIASES:
+            raise UnsupportedFilter(token)
+        modifier = MODIFIER_ALIASES[modifier]
+    else:
+        modifier = None
+
+    if key not in STRING_ATTRIBUTES + DATE_ATTRIBUTES:
+        raise UnsupportedFilter(token)
+
+    # Presence checks behave the same for all attribute types
+    if modifier == 'none' or (not value and modifier in (None, 'is')):
+        return lambda task: not task.get(key)
+    elif modifier == 'any' or (not value and modifier == 'isnt'):
+        return lambda task: bool(task.get(key))
+    elif not value:
+        raise UnsupportedFilter(token)
+
+    if key in DATE_ATTRIBUTES:
+        return compile_date_attribute(key, modifier, value)
+    else:
+        return compile_string_attribute(key, modifier, value)
+
+
+def compile_token(token):
+    if token[0] in ('+', '-'):
+        return compile_tag(token)
+    elif ':' in token:
+        return compile_attribute(token)
+    else:
+        raise UnsupportedFilter(token)
+
+
+class FilterParser(object):
+    """
+    Recursive descent parser, turning the list of filter args into
+    a predicate. The 'and' operator takes precedence over 'or', and
+    neighbouring terms are joined by 'and' implicitly.
+    """
+
+    def __init__(self, args):
+        self.args = list(args)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.args):
+            return self.args[self.position]
+
+    def consume(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.args:
+            return lambda task: True
+
+        predicate = self.parse_or()
+
+        if self.peek() is not None:
+            raise UnsupportedFilter(self.peek())
+
+        return predicate
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+
+        while self.peek() == 'or':
+            self.consume()
+            operands.append(self.parse_and())
+
+        if len(operands) == 1:
+            return operands[0]
+
+        return lambda task: any(operand(task) for operand in operands)
+
+    def parse_and(self):
+        operands = [self.parse_term()]
+
+        while self.peek() not in (None, 'or', ')'):
+            if self.peek() == 'and':
+                self.consume()
+            operands.append(self.parse_term())
+
+        if len(operands) == 1:
+            return operands[0]
+
+        return lambda task: all(operand(task) for operand in operands)
+
+    def parse_term(self):
+        token = self.consume()
+
+        if token is None or token in ('and', 'or', ')'):
+            raise UnsupportedFilter("Unexpected token: {0}".format(token))
+
+        if token == '(':
+            predicate = self.parse_or()
+            if self.consume() != ')':
+                raise UnsupportedFilter("Unbalanced parentheses")
+            return predicate
+
+        return compile_token(token)
+
+
+def compile_filter(args):
+    """
+    Compiles the list of TaskWarrior filter args into a predicate that
+    accepts a task dict, as obtained from the TaskWarrior export.
+
+    Raises UnsupportedFilter if the filter cannot be evaluated.
+    """
+
+    return FilterParser(args).parse()
+
+
+def is_supported(args):
+    try:
+        compile_filter(args)
+    except UnsupportedFilter:
+        return False
+    return True
+
+
+class TaskSnapshot(object):
+    """
+    Holds the tasks exported from a TaskWarrior instance, so that filters
+    can be evaluated without running TaskWarrior again.
+
+    The snapshot covers only the tasks matching the filters it was exported
+    with, unless it is complete. Task objects are created by make_task only
+    for the tasks that are actually requested.
+    """
+
+    def __init__(self, data, make_task, filters=(), complete=False,
+                 signature=None):
+        # List of raw dicts, as contained in the TaskWarrior export
+        self.data = data
+        self.make_task = make_task
+        self.filters = set(tuple(f) for f in filters)
+        self.complete = complete
+        self.signature = signature
+
+        self.tasks = dict()
+        self.index = None
+
+    def covers(self, args):
+        return self.complete or tuple(args) in self.filters
+
+    def task(self, data):
+        uuid = data['uuid']
+
+        if uuid not in self.tasks:
+            self.tasks[uuid] = self.make_task(data)
+
+        return self.tasks[uuid]
+
+    def get(self, uuid):
+        """
+        Returns the task with the given UUID, either full or short (first 8
+        characters), or None if it is not in the snapshot.
+        """
+
+        if self.index is None:
+            self.index = dict()
+            for data in self.data:
+                self.index[data['uuid']] = data
+                self.index[data['uuid'][:8]] = data
+
+        data = self.index.get(uuid)
+        return self.task(data) if data is not None else None
+
+    def filter(self, args):
+        """
+        Returns the set of tasks from the snapshot matching given filter args.
+        """
+
+        # Snapshot of a single filter contains exactly the matching tasks
+        if not self.complete and self.filters == set([tuple(args)]):
+            return set(self.task(data) for data in self.data)
+
+        predicate = compile_filter(args)
+        return set(self.task(data) for data in self.data if predicate(data))
@@ -1,5 +1,6 @@
 from __future__ import print_function
 import base64
+import datetime
 import re
 import os
 import pickle
@@ -13,6 +14,7 @@ sys.path.insert(0, BASE_DIR)
 
 from taskwiki import errors
 from taskwiki import cache as cache_module
+from taskwiki import diskcache
 from taskwiki import sort
 from taskwiki import util
 from taskwiki import viewport
@@ -22,7 +24,7 @@ from taskwiki import preset
 
 
 cache = cache_module.CacheRegistry()
-cache.load_current()
+cache.check_versions()
 
 
 class WholeBuffer(object):
@@ -44,6 +46,7 @@ class WholeBuffer(object):
         c.update_vwtasks_in_buffer()
         c.evaluate_viewports()
         c.buffer.push()
+        c.warm_up_completion()
 
     @staticmethod
     @errors.pretty_exception_handler
@@ -59,11 +62,40 @@ class WholeBuffer(object):
         c.load_presets()
         c.load_vwtasks()
         c.load_viewports()
+
+        # Let TaskWarrior process the changes without blocking the editor,
+        # the buffer is updated once the save is finished
+        if util.get_var('taskwiki_async_save') and util.HAS_TIMERS:
+            c.save_tasks_in_background()
+            vim.command(
+                "call timer_start(100, function('taskwiki#PollSave', [{0}]), "
+                "{{'repeat': -1}})".format(c.buffer.buffer_number)
+            )
+            return
+
         c.save_tasks()
         c.update_vwtasks_in_buffer()
         c.evaluate_viewports()
         c.buffer.push()
 
+    @staticmethod
+    @errors.pretty_exception_handler
+    @decorators.hold_vim_cursor
+    def poll_update_to_tw(buffer_number, timer):
+        """
+        Finishes the background save of the given buffer, once it is done.
+        """
+
+        c = cache.caches.get(buffer_number)
+
+        if c is not None and c.save_job is not None and c.save_job.is_running():
+            return
+
+        vim.command('call timer_stop({0})'.format(timer))
+
+        if c is not None:
+            c.complete_save()
+
 
 class SelectedTasks(object):
 
@@ -409,7 +441,9 @@ class Meta(object):
                 'kind2scope': {'h': 'header', 'p': 'preset', 'v': 'viewport'},
                 'sort': 0,
                 'ctagsbin': os.path.join(BASE_DIR, 'extra/vwtags.py'),
-                'ctagsargs': cache().markup_syntax
+                # Read the syntax directly, loading the cache here would
+                # defeat loading it only once the buffer is drawn
+                'ctagsargs': util.get_markup_syntax()
                 }
 
     @errors.pretty_exception_handler
@@ -431,6 +465,8 @@ class Meta(object):
             'TaskWikiTaskPriority': 'Error',
         }
 
+        batch = util.CommandBatch()
+
         # If tw support is enabled, try to find definition in TW first
         if util.get_var('taskwiki_source_tw_colors'):
 
@@ -441,13 +477,23 @@ class Meta(object):
 
                 if tw_def:
                     vim_def = util.convert_colorstring_for_vim(tw_def)
-                    vim.command('hi def {0} {1}'.format(syntax, vim_def))
+                    batch.command('hi def {0} {1}'.format(syntax, vim_def))
 
         # Define taskwiki (native) color. This can be overriden by user
         # by using :hi <group name> <color> command.
         for syntax in taskwiki_native_colors.keys():
-            vim.command('hi def link {0} {1}'
-                        .format(syntax, taskwiki_native_colors[syntax]))
+            batch.command('hi def link {0} {1}'
+                          .format(syntax, taskwiki_native_colors[syntax]))
+
+        batch.flush()
+
+
+# Outputs of the split reports, indexed by the TaskWarrior instance, the
+# arguments and the size of the window
+reports = dict()
+
+# Split reports running in the background, indexed by the buffer number
+pending_reports = dict()
 
 
 class Split(object):
@@ -460,6 +506,7 @@ class Split(object):
     cursorline = True
     size = None
     tw_extra_args = []
+    async_report = True
 
     @errors.pretty_exception_handler
     def __init__(self, args):
@@ -487,15 +534,119 @@ class Split(object):
     def full_args(self):
         return self.args + [self.command] + self.tw_extra_args
 
-    @errors.pretty_exception_handler
-    def execute(self):
+    def report(self):
         if self.colorful:
-            output = util.tw_execute_colorful(self.tw, self.full_args,
-                                              allow_failure=False,
-                                              maxwidth=self.maxwidth,
-                                              maxheight=self.maxheight)
+            return util.tw_execute_colorful(self.tw, self.full_args,
+                                            allow_failure=False,
+                                            maxwidth=self.maxwidth,
+                                            maxheight=self.maxheight)
         else:
-            output = util.tw_execute_safely(self.tw, self.full_args)
+            return util.tw_execute_safely(self.tw, self.full_args)
+
+    def report_key(self):
+        return (
+            self.tw,
+            tuple(self.full_args),
+            self.colorful,
+            vim.current.window.width if self.maxwidth else None,
+            vim.current.window.height if self.maxheight else None,
+        )
+
+    def report_signature(self):
+        # Reports depend on the current date as well
+        return (
+            diskcache.data_signature(self.tw),
+            diskcache.config_signature(self.tw),
+            datetime.date.today(),
+        )
+
+    def store_report(self, key, signature, output):
+        # Keep the output only if the data did not change during the report,
+        # e.g. by the garbage collection
+        if output is not None and signature[0] == diskcache.data_signature(self.tw):
+            reports[key] = (signature, output)
+
+    def cached_report(self):
+        """
+        Returns the output of the report, which is reused as long as the
+        TaskWarrior data and configuration are unchanged.
+        """
+
+        key, signature = self.report_key(), self.report_signature()
+
+        report = reports.get(key)
+        if report is not None and report[0] == signature:
+            return report[1]
+
+        output = self.report()
+        self.store_report(key, signature, output)
+        return output
+
+    def start_report(self):
+        """
+        Opens the split with a placeholder and runs the report in the
+        background. The output is streamed into the split.
+        """
+
+        override = {}
+        if self.colorful:
+            util.colorful_override(override, self.maxwidth, self.maxheight)
+
+        key, signature = self.report_key(), self.report_signature()
+        command = self.tw._get_command_args(self.full_args, override)
+        env = {'TASKRC': self.tw.taskrc_location} if self.tw.taskrc_location else {}
+
+        buffer_number = util.show_in_split(
+            [u"Running task {0}...".format(self.command)],
+            size=self.size,
+            name=self.split_name,
+            vertical=self.vertical,
+            activate_cursorline=self.cursorline,
+            ansi_esc=False,
+        )
+
+        if buffer_number is None:
+            return
+
+        pending_reports[buffer_number] = (self, key, signature)
+        vim.command('call taskwiki#StartReport({0}, {1}, {2})'.format(
+            buffer_number, util.vim_literal(command), util.vim_literal(env)))
+
+    @staticmethod
+    @errors.pretty_exception_handler
+    def finish_report(buffer_number, status):
+        split, key, signature = pending_reports.pop(buffer_number)
+        result = vim.eval('taskwiki#ReportOutput({0})'.format(buffer_number))
+        output = util.decode_bytes(result['output'])
+        window = vim.eval('bufwinid({0})'.format(buffer_number))
+
+        if status != 0 or not output:
+            error_lines = [line for line in util.decode_bytes(result['errors']) if line]
+            print(error_lines[-1] if error_lines else "No output.", file=sys.stderr)
+            vim.command('silent! bwipe {0}'.format(buffer_number))
+            return
+
+        split.store_report(key, signature, output)
+
+        # The placeholder determined the size of the split so far
+        if window != '-1':
+            size = split.size or util.split_size(output, split.vertical)
+            resize = 'vertical resize' if split.vertical else 'resize'
+            vim.command("call win_execute({0}, '{1} {2}')".format(window, resize, size))
+
+            if util.ANSI_ESC_AVAILABLE:
+                vim.command("call win_execute({0}, 'AnsiEsc')".format(window))
+
+    @errors.pretty_exception_handler
+    def execute(self):
+        if (self.async_report and util.HAS_JOBS and
+                util.get_var('taskwiki_async_reports')):
+            report = reports.get(self.report_key())
+            if report is None or report[0] != self.report_signature():
+                self.start_report()
+                return
+
+        output = self.cached_report()
 
         util.show_in_split(
             output,
@@ -509,6 +660,7 @@ class Split(object):
 class CallbackSplitMixin(object):
 
     split_cursorline = False
+    async_report = False
 
     @errors.pretty_exception_handler
     def __init__(self, args):
@@ -0,0 +1,51 @@
+"""
+Transfers the buffer content incrementally under neovim, where every access
+to the buffer is a round trip over RPC.
+
+Neovim reports the changed lines to the lua/taskwiki/buffer.lua module,
+which returns only the lines changed since the last fetch.
+"""
+
+import vim  # pylint: disable=F0401
+
+from taskwiki import util
+
+ENABLED = util.NEOVIM and vim.eval('has("nvim-0.5")') == "1"
+
+
+def apply_changes(lines, changes):
+    """
+    Returns the buffer content, given its content at the last fetch and the
+    changes since then.
+    """
+
+    changed = list(changes['lines'] or [])
+
+    if changes['full']:
+        return changed
+
+    return lines[:changes['first']] + changed + lines[changes['old_last']:]
+
+
+def fetch(buffer_number, lines=None):
+    """
+    Returns the current content of the buffer. If the content at the last
+    fetch is given, only the changed lines are transferred.
+    """
+
+    changes = vim.exec_lua(
+        "return require('taskwiki.buffer').fetch(...)",
+        buffer_number, lines is not None)
+
+    return apply_changes(lines, changes)
+
+
+def set_lines(buffer_number, hunks):
+    """
+    Replaces the given ranges of lines, as (start, end, lines) triples
+    ordered from the top of the buffer, with a single call.
+    """
+
+    vim.exec_lua(
+        "require('taskwiki.buffer').set_lines(...)",
+        buffer_number, [list(hunk) for hunk in hunks])
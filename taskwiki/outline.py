@@ -0,0 +1,128 @@
+import bisect
+
+
+def closest(lines, line):
+    """
+    Returns the closest of the sorted line numbers at or above the given
+    line, or the first one below it, if there is none above.
+    """
+
+    index = bisect.bisect_right(lines, line)
+
+    if index > 0:
+        return lines[index - 1]
+    elif lines:
+        return lines[0]
+
+
+class Outline(object):
+    """
+    Index of the headers, viewports and tasks in the buffer, so that the
+    section enclosing a line can be found without scanning the buffer.
+
+    The index is built on the first use and needs to be reset whenever lines
+    are inserted, removed or moved.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.reset()
+
+    def reset(self):
+        self._headers = None
+        self._viewports = None
+        self._tasks = None
+        self._parents = None
+
+    def find_lines(self, *classes):
+        return [
+            i for i in range(len(self.cache.buffer))
+            if any(self.cache.line[(cls, i)] for cls in classes)
+        ]
+
+    @property
+    def headers(self):
+        from taskwiki import preset, viewport
+
+        if self._headers is None:
+            self._headers = self.find_lines(preset.PresetHeader, viewport.ViewPort)
+
+        return self._headers
+
+    @property
+    def viewport_lines(self):
+        from taskwiki import viewport
+
+        if self._viewports is None:
+            self._viewports = [
+                i for i in self.headers
+                if self.cache.line[(viewport.ViewPort, i)]
+            ]
+
+        return self._viewports
+
+    @property
+    def task_lines(self):
+        from taskwiki import vwtask
+
+        if self._tasks is None:
+            self._tasks = self.find_lines(vwtask.VimwikiTask)
+
+        return self._tasks
+
+    @property
+    def parents(self):
+        """
+        Line numbers of the parent tasks, indexed by the lines of the
+        indented tasks that have one.
+        """
+
+        if self._parents is None:
+            self._parents = self.find_parents()
+
+        return self._parents
+
+    def find_parents(self):
+        """
+        Resolves the parents of all the tasks in a single pass. The parent is
+        the closest line above with lower indentation, if it is a task.
+        """
+
+        from taskwiki import vwtask
+
+        parents = dict()
+
+        # Stack of the lines with strictly increasing indentation, such that
+        # the closest line with indentation lower than any given value can
+        # be found in it
+        widths, lines = [], []
+
+        for i, line in enumerate(self.cache.buffer):
+            match = self.cache.line[(vwtask.VimwikiTask, i)]
+
+            if match and match.group('space'):
+                indent = len(match.group('space').replace('\t', '    '))
+                index = bisect.bisect_left(widths, indent) - 1
+                if index >= 0 and self.cache.line[(vwtask.VimwikiTask, lines[index])]:
+                    parents[i] = lines[index]
+
+            # Tab is equal to four spaces
+            width = len(line.replace('\t', '    ')) - len(line.lstrip())
+            while widths and widths[-1] >= width:
+                widths.pop()
+                lines.pop()
+
+            widths.append(width)
+            lines.append(i)
+
+        return parents
+
+    def enclosing_header(self, line):
+        """
+        Returns the line of the closest header or viewport above the given
+        line, or None if there is none.
+        """
+
+        index = bisect.bisect_left(self.headers, line)
+        if index > 0:
+            return self.headers[index - 1]
@@ -1,6 +1,7 @@
 from taskwiki import constants
 from taskwiki import util
 
+
 class TaskSorter(object):
     def __init__(self, cache, tasks, sortstring=None):
         self.cache = cache
@@ -26,20 +27,26 @@ class TaskSorter(object):
         # Generate the empty nodes
         node_list = [TaskCollectionNode(vwtask, comparator) for vwtask in task_list]
 
-        # Set parents and children for every node
+        # Index the nodes by the tasks depending on them. Saved tasks are
+        # identified by their UUIDs, unsaved ones by the Task objects
+        parents = dict()
         for node in node_list:
-            # Find all children of this node
-            node.children = [child for child in node_list
-                             if child.vwtask.task in node.vwtask.task['depends']]
+            for uuid in util.dependency_uuids(node.vwtask.task):
+                parents.setdefault(uuid, []).append(node)
+            for task in util.unsaved_dependencies(node.vwtask.task):
+                parents.setdefault(id(task), []).append(node)
 
-            # Set the parent link in the children
-            for child in node.children:
+        # Set parents and children for every node
+        for child in node_list:
+            task = child.vwtask.task
+            for node in parents.get(task['uuid'] or id(task), []):
+                node.children.append(child)
                 child.parent = node
 
         root_node_list = [node for node in node_list
                           if node.parent is None]
 
-        root_node_list.sort()
+        root_node_list.sort(key=lambda node: node.sort_key)
 
         for node in root_node_list:
             node.sort()
@@ -51,6 +58,14 @@ class TaskSorter(object):
         for node in root_node_list:
             vwtasks_sorted += node.full_list
 
+        old_positions = [node.vwtask['line_number'] for node in vwtasks_sorted]
+        block = list(range(base_offset, base_offset + len(old_positions)))
+
+        # Tasks forming a contiguous block can be rearranged at once
+        if sorted(old_positions) == block:
+            self.cache.reorder_lines(base_offset, old_positions)
+            return
+
         for offset in range(len(vwtasks_sorted)):
             self.cache.swap_lines(
                 base_offset + offset,
@@ -84,50 +99,42 @@ class CustomNodeComparator(object):
 
             self.sort_attrs.append((attr, reverse))
 
-    def generic_compare(self, first, second, method):
+    def sort_key(self, vwtask):
+        """
+        Computes the key to sort the given task by. Missing values come last
+        for each attribute, regardless of the reverse flag.
+        """
+
+        key = []
+
         for sort_attr, reverse in self.sort_attrs:
-            # Pick the values we are supposed to sort on
-            first_value = first.vwtask[sort_attr]
-            second_value = second.vwtask[sort_attr]
-
-            # Swap the method of the sort if reversed is True
-            if method == 'gt' and reverse == True:
-                loop_method = 'lt'
-            elif method == 'lt' and reverse == True:
-                loop_method = 'gt'
-            else:
-                loop_method = method
+            value = vwtask[sort_attr]
 
-            # Equality on values, continue loop
-            if first_value is None and second_value is None:
-                continue
+            if value is None:
+                key.append((1,))
+            elif reverse:
+                key.append((0, ReversedValue(value)))
+            else:
+                key.append((0, value))
 
-            # None values do not respect reverse flags, use method
-            if first_value is not None and second_value is None:
-                return True if method == 'lt' else False
+        return tuple(key)
 
-            if first_value is None and second_value is not None:
-                return True if method == 'gt' else False
 
-            # Non-None values should respect reverse flags, use loop_method
-            if first_value < second_value:
-                return True if loop_method == 'lt' else False
-            elif first_value > second_value:
-                return True if loop_method == 'gt' else False
-            else:
-                # Values are equal, move to next distinguisher
-                continue
+class ReversedValue(object):
+    """
+    Wraps a value to invert its ordering.
+    """
 
-        return True if method == 'eq' else False
+    __slots__ = ('value',)
 
-    def lt(self, first, second):
-        return self.generic_compare(first, second, 'lt')
+    def __init__(self, value):
+        self.value = value
 
-    def gt(self, first, second):
-        return self.generic_compare(first, second, 'gt')
+    def __eq__(self, other):
+        return self.value == other.value
 
-    def eq(self, first, second):
-        return self.generic_compare(first, second, 'eq')
+    def __lt__(self, other):
+        return other.value < self.value
 
 
 class TaskCollectionNode(object):
@@ -140,7 +147,7 @@ class TaskCollectionNode(object):
         self.vwtask = vwtask
         self._parent = None
         self.children = []
-        self.comparator = comparator
+        self.sort_key = comparator.sort_key(vwtask)
 
     @property
     def parent(self):
@@ -170,7 +177,7 @@ class TaskCollectionNode(object):
             child.build_indentation(indent + 4)
 
     def sort(self):
-        self.children.sort()
+        self.children.sort(key=lambda node: node.sort_key)
 
         for child in self.children:
             child.sort()
@@ -182,12 +189,3 @@ class TaskCollectionNode(object):
 
     def __repr__(self):
         return u"Node for with ID: {0}".format(self.vwtask.task['id'] or self.vwtask.task['uuid'])
-
-    def __lt__(self, other):
-        return self.comparator.lt(self, other)
-
-    def __gt__(self, other):
-        return self.comparator.lt(self, other)
-
-    def __eq__(self, other):
-        return self.comparator.lt(self, other)
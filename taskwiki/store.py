@@ -1,8 +1,214 @@
-from tasklib import TaskWarrior
+import bisect
+import json
+import subprocess
+import threading
+
+try:
+    from shutil import which
+except ImportError:
+    # Python 2
+    from distutils.spawn import find_executable as which
+
+from tasklib import Task, TaskWarrior
+from tasklib.task import ReadOnlyDictView
 
 from taskwiki import errors
 
 
+# Configurations of the TaskWarrior instances, shared by all the buffers and
+# indexed by the taskrc location, data location and TaskWarrior version
+configs = dict()
+
+# TaskWarrior instances shared by all the buffers, indexed by their definition
+shared_warriors = dict()
+
+# Versions of the task binaries, indexed by their path
+versions = dict()
+
+# Background checks of the versions, indexed by the path of the task binary
+version_checks = dict()
+
+
+def task_binary(task_command):
+    """
+    Returns the given task command with the binary resolved to its path, or
+    None if the binary is not found.
+    """
+
+    command = task_command.split()
+    path = which(command[0]) if command else None
+    if path is None:
+        return None
+
+    return [path] + command[1:]
+
+
+def read_version(binary):
+    process = subprocess.Popen(
+        binary + ['--version'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE)
+    return process.communicate()[0].decode('utf-8').strip('\n')
+
+
+def task_version(task_command):
+    """
+    Returns the version of the given task binary, which is obtained only once
+    for each modification of the binary, or None if it is not found.
+    """
+
+    from taskwiki import diskcache
+
+    binary = task_binary(task_command)
+    if binary is None:
+        return None
+
+    key = ' '.join(binary)
+    signature = diskcache.file_signature(binary[:1])
+
+    version = versions.get(key)
+    if version is not None and version[0] == signature:
+        return version[1]
+
+    persistent = diskcache.enabled()
+
+    data = None
+    if persistent:
+        data = diskcache.load('version', key, signature)
+
+    if data is None:
+        # Wait for the background check, if it was started
+        check = version_checks.pop(key, None)
+        if check is not None:
+            check.thread.join()
+
+        if check is not None and check.signature == signature:
+            data = check.version
+        else:
+            data = read_version(binary)
+
+        if persistent:
+            diskcache.save('version', key, signature, data)
+
+    versions[key] = (signature, data)
+    return data
+
+
+def check_version(task_command):
+    """
+    Starts obtaining the version of the given task binary in the background,
+    unless it is known already. The first task_version call waits for it.
+    """
+
+    from taskwiki import diskcache
+
+    binary = task_binary(task_command)
+    if binary is None:
+        return
+
+    key = ' '.join(binary)
+    signature = diskcache.file_signature(binary[:1])
+
+    version = versions.get(key)
+    if key in version_checks or (version is not None and version[0] == signature):
+        return
+
+    if diskcache.enabled() and diskcache.load('version', key, signature) is not None:
+        return
+
+    version_checks[key] = VersionCheck(binary, signature)
+
+
+class VersionCheck(object):
+    """
+    Obtains the version of a task binary in a separate thread, which must not
+    access vim at all.
+    """
+
+    def __init__(self, binary, signature):
+        self.binary = binary
+        self.signature = signature
+        self.version = None
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.version = read_version(self.binary)
+        except OSError:
+            # Let task_version obtain it again and report the failure
+            self.signature = None
+
+
+def get_warrior(**kwargs):
+    """
+    Returns the TaskWarrior instance for the given definition, shared by all
+    the buffers.
+    """
+
+    key = json.dumps(kwargs, sort_keys=True)
+    tw = shared_warriors.get(key)
+
+    if tw is None:
+        tw = CachedConfigTaskWarrior(
+            version_override=task_version(kwargs.get('task_command', 'task')),
+            **kwargs
+        )
+
+        # Make sure context is not respected in any TaskWarrior
+        tw.overrides.update({'context': ''})
+        shared_warriors[key] = tw
+    else:
+        # Check whether the configuration is still valid in each buffer
+        tw._config = None
+
+    return tw
+
+
+class CachedConfigTaskWarrior(TaskWarrior):
+    """
+    TaskWarrior which takes its configuration from the process wide cache,
+    or from the persistent cache, if enabled. Running the show command is
+    needed only if the taskrc or any of the files it includes changed.
+    """
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = self.load_config()
+
+        return self._config
+
+    def load_config(self):
+        from taskwiki import diskcache
+
+        key = '{0}:{1}:{2}'.format(
+            diskcache.taskrc_location(self),
+            self.overrides.get('data.location', ''),
+            self.version,
+        )
+        signature = diskcache.config_signature(self)
+
+        config = configs.get(key)
+        if config is not None and config[0] == signature:
+            return config[1]
+
+        data = None
+        if diskcache.enabled():
+            data = diskcache.load('config', key, signature)
+
+        if data is None:
+            data = dict(super(CachedConfigTaskWarrior, self).config.items())
+            if diskcache.enabled():
+                diskcache.save('config', key, signature, data)
+
+        config = ReadOnlyDictView(data)
+        configs[key] = (signature, config)
+        return config
+
+
 class WarriorStore(object):
     """
     Stores all instances of TaskWarrior objects.
@@ -15,16 +221,12 @@ class WarriorStore(object):
         )
 
         # Setup the store of TaskWarrior objects
-        self.warriors = {'default': TaskWarrior(**default_kwargs)}
+        self.warriors = {'default': get_warrior(**default_kwargs)}
 
         for key in extra_warrior_defs.keys():
             current_kwargs = default_kwargs.copy()
             current_kwargs.update(extra_warrior_defs[key])
-            self.warriors[key] = TaskWarrior(**current_kwargs)
-
-        # Make sure context is not respected in any TaskWarrior
-        for tw in self.warriors.values():
-            tw.overrides.update({'context':''})
+            self.warriors[key] = get_warrior(**current_kwargs)
 
     def __getitem__(self, key):
         try:
@@ -101,27 +303,153 @@ class LineNumberedKeyedStoreMixin(object):
         self[position1] = self.store.get(position2)
         self[position2] = temp
 
+    def reorder(self, position, old_positions):
+        items = [self.store.get(i) for i in old_positions]
+
+        for offset, item in enumerate(items):
+            self[position + offset] = item
+
+
+class LineIndexedStore(NoNoneStore):
+    """
+    Stores the items in a list aligned with the lines of the buffer, so that
+    inserting or removing a line shifts all the following items by a single
+    list operation, instead of rebuilding the whole index.
+    """
+
+    def __init__(self, cache):
+        super(LineIndexedStore, self).__init__(cache)
+        self.store = []
+
+    def get(self, line):
+        if 0 <= line < len(self.store):
+            return self.store[line]
+
+    def __getitem__(self, line):
+        item = self.get(line)
+
+        if item is None:
+            item = self.get_method(line)
+
+            # If we successfully obtained an item, save it to the cache
+            if item is not None:
+                self.set(line, item)
+
+        return item  # May return None if the line has no item
+
+    def set(self, line, value):
+        if line >= len(self.store):
+            # Never extend the list just to store None
+            if value is None:
+                return
+            self.store.extend([None] * (line + 1 - len(self.store)))
+
+        self.store[line] = value
+
+    def __setitem__(self, line, value):
+        self.set(line, value)
+
+    def __delitem__(self, line):
+        if 0 <= line < len(self.store):
+            self.store[line] = None
+
+    def __contains__(self, line):
+        return self.get(line) is not None
+
+    def values(self):
+        return [item for item in self.store if item is not None]
+
+    def items(self):
+        return [(line, item) for line, item in enumerate(self.store)
+                if item is not None]
+
+    def clear(self):
+        self.store = []
+
+    def shift(self, position, offset):
+        if position >= len(self.store):
+            return
+
+        if offset > 0:
+            self.store[position:position] = [None] * offset
+        else:
+            # The lines being removed are expected to be already deleted
+            del self.store[position:position - offset]
+
+    def swap(self, position1, position2):
+        temp = self.get(position1)
+        self.set(position1, self.get(position2))
+        self.set(position2, temp)
+
+    def reorder(self, position, old_positions):
+        items = [self.get(i) for i in old_positions]
+
+        for offset, item in enumerate(items):
+            self.set(position + offset, item)
+
+
 class TaskStore(NoNoneStore):
 
     def get_method(self, key):
+        # Use the complete snapshot of the TaskWarrior data, if available
+        snapshot = self.cache.snapshot[key.tw]
+        if snapshot is not None and snapshot.complete:
+            task = snapshot.get(key.value)
+            if task is None:
+                raise Task.DoesNotExist(
+                    "Task with UUID '{0}' does not exist.".format(key.value))
+            return task
+
         return key.tw.tasks.get(uuid=key.value)
 
 
-class VwtaskStore(LineNumberedKeyedStoreMixin, NoNoneStore):
+class VwtaskStore(LineIndexedStore):
+    """
+    Stores the VimwikiTasks by their line. Line numbers of the tasks moved
+    by insertions or removals of lines are updated lazily, only once any of
+    them is needed.
+    """
 
-    def shift(self, position, offset):
-        for line, vwtask in self.store.items():
-            if line >= position:
-                vwtask['line_number'] += offset
+    def __init__(self, cache):
+        super(VwtaskStore, self).__init__(cache)
+
+        # First line whose task might have outdated line number
+        self.outdated_from = None
+
+    def update_line_numbers(self):
+        if self.outdated_from is None:
+            return
+
+        for line in range(self.outdated_from, len(self.store)):
+            vwtask = self.store[line]
+            if vwtask is not None:
+                vwtask.vim_data['line_number'] = line
 
+        self.outdated_from = None
+
+    def shift(self, position, offset):
         super(VwtaskStore, self).shift(position, offset)
 
+        if self.outdated_from is None or position < self.outdated_from:
+            self.outdated_from = position
+
     def swap(self, position1, position2):
         super(VwtaskStore, self).swap(position1, position2)
 
         for index in (position1, position2):
-            if self.store.get(index) is not None:
-                self[index]['line_number'] = index
+            if self.get(index) is not None:
+                self.get(index)['line_number'] = index
+
+    def reorder(self, position, old_positions):
+        super(VwtaskStore, self).reorder(position, old_positions)
+
+        for index in range(position, position + len(old_positions)):
+            if self.get(index) is not None:
+                self.get(index).vim_data['line_number'] = index
+
+    def clear(self):
+        super(VwtaskStore, self).clear()
+        self.outdated_from = None
 
     def get_method(self, line):
         from taskwiki import vwtask
@@ -144,59 +472,124 @@ class ViewportStore(LineNumberedKeyedStoreMixin, NoNoneStore):
             if self.store.get(index) is not None:
                 self[index].line_number = index
 
+    def reorder(self, position, old_positions):
+        super(ViewportStore, self).reorder(position, old_positions)
+
+        for index in range(position, position + len(old_positions)):
+            if self.store.get(index) is not None:
+                self[index].line_number = index
+
     def get_method(self, line):
-        import viewport
+        from taskwiki import viewport
         return viewport.ViewPort.from_line(line, self.cache)
 
 
 class PresetStore(LineNumberedKeyedStoreMixin, NoNoneStore):
 
     def get_method(self, line):
-        import preset
-        return preset.PresetHeader.from_line(line, self.cache)
+        from taskwiki import preset
 
+        # Each header needs the previous one to find its parent, resolve
+        # the ones above that are not stored yet first
+        headers = self.cache.outline.headers
+        index = bisect.bisect_left(headers, line)
+        if index == len(headers) or headers[index] != line:
+            return preset.PresetHeader.from_line(line, self.cache)
 
-class LineStore(NoNoneStore):
+        start = index
+        while start > 0 and headers[start - 1] not in self:
+            start -= 1
 
-    def __delitem__(self, number):
-        for cls, i in list(self.store.keys()):
-            if i == number:
-                del self.store[(cls, i)]
+        previous = self.store[headers[start - 1]] if start > 0 else None
 
-    def get_method(self, key):
+        for header_line in headers[start:index]:
+            header = preset.PresetHeader.from_line(header_line, self.cache, previous)
+            self[header_line] = header
+            previous = header or previous
+
+        return preset.PresetHeader.from_line(line, self.cache, previous)
+
+
+class NoMatch(object):
+    """
+    Stands for a line that was parsed, but did not match. Unlike None it is
+    kept in the LineStore, so that the line is not parsed repeatedly.
+    """
+
+    def __init__(self, string):
+        self.string = string
+
+    def __bool__(self):
+        return False
+
+    __nonzero__ = __bool__
+
+
+class LineStore(LineIndexedStore):
+    """
+    Stores the results of parsing the lines, for each line a dict indexed by
+    the class that parsed it.
+    """
+
+    def __getitem__(self, key):
         cls, line = key
-        return cls.parse_line(self.cache, line)
+        matches = self.get(line)
 
-    def shift(self, position, offset):
-        new_store = {
-            (cls, i + offset if i >= position else i): self.store[(cls, i)]
-            for cls, i in self.store.keys()
-        }
+        if matches is None:
+            matches = dict()
+            self.set(line, matches)
 
-        self.store = new_store
+        if cls not in matches:
+            matches[cls] = self.get_method(key)
 
-    def swap(self, position1, position2):
-        temp_store1 = {
-            (cls, i): self.store[(cls, i)]
-            for cls, i in self.store.keys()
-            if i == position1
-        }
+        return matches[cls]
 
-        temp_store2 = {
-            (cls, i): self.store[(cls, i)]
-            for cls, i in self.store.keys()
-            if i == position2
-        }
+    def __setitem__(self, key, value):
+        cls, line = key
+        matches = self.get(line)
 
-        for cls, i in list(self.store.keys()):
-            if i == position1 or i == position2:
-                del self.store[(cls, i)]
+        if matches is None:
+            matches = dict()
+            self.set(line, matches)
 
-        for cls, i in temp_store1.keys():
-            self.store[(cls, position2)] = temp_store1[(cls, i)]
+        matches[cls] = value
 
-        for cls, i in temp_store2.keys():
-            self.store[(cls, position1)] = temp_store2[(cls, i)]
+    def get_method(self, key):
+        cls, line = key
+        match = cls.parse_line(self.cache, line)
+        return match or NoMatch(self.cache.buffer[line])
+
+    def retain(self, blocks):
+        """
+        Keeps only the parsed lines covered by the given blocks of unchanged
+        lines, as tuples (old_start, new_start, size), and moves them to
+        their new positions.
+        """
+
+        new_store = [None] * len(self.cache.buffer)
+
+        for old_start, new_start, size in blocks:
+            for offset in range(size):
+                matches = self.get(old_start + offset)
+                if not matches:
+                    continue
+
+                # Lines modified by taskwiki itself need not have been parsed
+                # again, make sure the parsed content is still up to date
+                position = new_start + offset
+                line = self.cache.buffer[position]
+                matches = dict(
+                    (cls, match) for cls, match in matches.items()
+                    if match.string == line
+                )
+
+                if matches:
+                    new_store[position] = matches
+
+        self.store = new_store
+
+    def swap(self, position1, position2):
+        super(LineStore, self).swap(position1, position2)
 
         # Also change the actual line content
         temp = self.cache.buffer[position1]
@@ -204,8 +597,90 @@ class LineStore(NoNoneStore):
         self.cache.buffer[position2] = temp
 
 
+class SnapshotStore(NoNoneStore):
+    """
+    Stores the tasks exported from TaskWarrior, keyed by the TaskWarrior
+    instance.
+
+    If the persistent cache is enabled, the snapshot contains all the tasks
+    and is reused as long as the TaskWarrior data files are unchanged.
+    Otherwise it holds the tasks exported for all the viewports in the
+    buffer, using one export per TaskWarrior instance.
+    """
+
+    def __getitem__(self, tw):
+        from taskwiki import diskcache
+
+        # Drop the snapshot if the TaskWarrior data changed meanwhile
+        snapshot = self.store.get(tw)
+        if snapshot is not None and snapshot.signature is not None:
+            if snapshot.signature != diskcache.data_signature(tw):
+                del self[tw]
+
+        return super(SnapshotStore, self).__getitem__(tw)
+
+    def get_method(self, tw):
+        from taskwiki import diskcache
+
+        if diskcache.enabled():
+            return self.load_complete(tw)
+        else:
+            return self.load_viewports(tw)
+
+    def load_complete(self, tw):
+        from taskwiki import diskcache, filtering, util
+
+        key = diskcache.data_location(tw)
+        signature = diskcache.data_signature(tw)
+        data = diskcache.load('snapshot', key, signature)
+
+        if data is None:
+            data = util.tw_export_data(tw, [])
+
+            # Persist the export only if the data did not change during it,
+            # e.g. by the garbage collection or the recurrence
+            new_signature = diskcache.data_signature(tw)
+            if new_signature == signature:
+                diskcache.save('snapshot', key, signature, data)
+            signature = new_signature
+
+        return filtering.TaskSnapshot(
+            data,
+            lambda task_data: util.task_from_data(tw, task_data),
+            complete=True,
+            signature=signature,
+        )
+
+    def load_viewports(self, tw):
+        from taskwiki import filtering, util
+
+        # Collect the distinct filters of the viewports that use this
+        # TaskWarrior instance and that can be evaluated by taskwiki
+        filters = []
+        for port in self.cache.viewport.values():
+            if port.tw != tw or port.taskfilter in filters:
+                continue
+            if filtering.is_supported(port.taskfilter):
+                filters.append(port.taskfilter)
+
+        if not filters:
+            return None
+
+        # Query the union of all the viewport filters
+        args = []
+        for taskfilter in filters:
+            args += ['or'] if args else []
+            args += ['('] + taskfilter + [')']
+
+        return filtering.TaskSnapshot(
+            util.tw_export_data(tw, args),
+            lambda task_data: util.task_from_data(tw, task_data),
+            filters,
+        )
+
+
 class CompletionStore(NoNoneStore):
 
     def get_method(self, key):
         from taskwiki import completion
-        return completion.Completion(key)
+        return completion.get_completion(key)
@@ -2,21 +2,29 @@
 from __future__ import print_function
 from packaging import version
 
+import bisect
 import contextlib
+import json
 import os
 import random
 import sys
+import tempfile
+import uuid
 import vim  # pylint: disable=F0401
 
 import tasklib
+import tasklib.lazy
 
 from taskwiki.errors import TaskWikiException
+from taskwiki import constants
 from taskwiki import regexp
 
 # Detect if command AnsiEsc is available
 ANSI_ESC_AVAILABLE = vim.eval('exists(":AnsiEsc")') == '2'
 NEOVIM = (vim.eval('has("nvim")') == "1")
 HAS_TERMINAL = (NEOVIM or (int(vim.eval("v:version")) >= 800))
+HAS_TIMERS = (vim.eval('has("timers")') == "1")
+HAS_JOBS = (vim.eval('(has("job") || has("nvim")) && exists("*win_execute")') == "1")
 
 def tw_modstring_to_args(line):
     output = []
@@ -177,6 +185,9 @@ def convert_colorstring_for_vim(string):
 
     return result
 
+def get_markup_syntax():
+    return vim.eval("vimwiki#vars#get_wikilocal('syntax')") or 'default'
+
 def get_buffer_shortname():
     return vim.eval('expand("%")')
 
@@ -210,9 +221,62 @@ def get_lines_above(including_current=True):
 def strip_ansi_escape_sequence(string):
     return regexp.ANSI_ESCAPE_SEQ.sub("", string)
 
+def vim_literal(value):
+    """
+    Returns the vim expression for the given string, number, list or dict.
+    """
+
+    # Escapes used by JSON are valid in the double quoted vim strings
+    return json.dumps(value, ensure_ascii=False)
+
+class CommandBatch(object):
+    """
+    Collects vim commands and executes them all with a single call, which
+    saves the round trips to neovim. Used as a context manager, the commands
+    are executed when the block is left.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def command(self, command):
+        self.commands.append(command)
+
+    def flush(self):
+        if self.commands:
+            vim.command('call execute({0})'.format(vim_literal(self.commands)))
+            self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+def split_size(lines, vertical=False):
+    if vertical:
+        # Maximum number of columns used + small offset
+        # Strip the color codes, since they do not show up in the split
+        size = max([len(strip_ansi_escape_sequence(l)) for l in lines]) + 1
+
+        # If absolute maximum width was set, do not exceed it
+        if get_var('taskwiki_split_max_width'):
+            size = min(size, get_var('taskwiki_split_max_width'))
+
+    else:
+        # Number of lines
+        size = len(lines)
+
+        # If absolute maximum height was set, do not exceed it
+        if get_var('taskwiki_split_max_height'):
+            size = min(size, get_var('taskwiki_split_max_height'))
+
+    return size
+
 def show_in_split(lines, size=None, position="belowright", vertical=False,
                   name="taskwiki", replace_opened=True,
-                  activate_cursorline=False):
+                  activate_cursorline=False, ansi_esc=True):
 
     # If there is no output, bail
     if not lines:
@@ -225,10 +289,11 @@ def show_in_split(lines, size=None, position="belowright", vertical=False,
     # If the multiple buffers with this name are not desired
     # cloase all the old ones in this tabpage
     if replace_opened:
-        for buf in get_valid_tabpage_buffers(vim.current.tabpage):
-            shortname = buffer_shortname(buf)
-            if shortname.startswith(name):
-                vim.command('bwipe {0}'.format(shortname))
+        with CommandBatch() as batch:
+            for buf in get_valid_tabpage_buffers(vim.current.tabpage):
+                shortname = buffer_shortname(buf)
+                if shortname.startswith(name):
+                    batch.command('bwipe {0}'.format(shortname))
 
     # Generate a random suffix for the buffer name
     # This is needed since AnsiEsc saves the buffer name inside
@@ -239,22 +304,7 @@ def show_in_split(lines, size=None, position="belowright", vertical=False,
 
     # Compute the size of the split
     if size is None:
-        if vertical:
-            # Maximum number of columns used + small offset
-            # Strip the color codes, since they do not show up in the split
-            size = max([len(strip_ansi_escape_sequence(l)) for l in lines]) + 1
-
-            # If absolute maximum width was set, do not exceed it
-            if get_var('taskwiki_split_max_width'):
-                size = min(size, get_var('taskwiki_split_max_width'))
-
-        else:
-            # Number of lines
-            size = len(lines)
-
-            # If absolute maximum height was set, do not exceed it
-            if get_var('taskwiki_split_max_height'):
-                size = min(size, get_var('taskwiki_split_max_height'))
+        size = split_size(lines, vertical)
 
     # Set cursorline in the window
     cursorline_activated_in_window = None
@@ -266,8 +316,9 @@ def show_in_split(lines, size=None, position="belowright", vertical=False,
     # Call 'vsplit' for vertical, otherwise 'split'
     vertical_prefix = 'v' if vertical else ''
 
-    vim.command("{0} {1}{2}split".format(position, size, vertical_prefix))
-    vim.command("edit {0}".format(name))
+    with CommandBatch() as batch:
+        batch.command("{0} {1}{2}split".format(position, size, vertical_prefix))
+        batch.command("edit {0}".format(name))
 
     # For some weird reason, edit does not work for some users, but
     # enew + file <name> does. Use as fallback.
@@ -281,39 +332,38 @@ def show_in_split(lines, size=None, position="belowright", vertical=False,
         return
 
     # We're good to go!
-    vim.command("setlocal noswapfile")
-    vim.command("setlocal modifiable")
-    vim.current.buffer.append(lines, 0)
-
-    vim.command("setlocal readonly")
-    vim.command("setlocal nomodifiable")
-    vim.command("setlocal buftype=nofile")
-    vim.command("setlocal nowrap")
-    vim.command("setlocal nonumber")
-
-    # Keep window size fixed despite resizing
-    vim.command("setlocal winfixheight")
-    vim.command("setlocal winfixwidth")
-
-    # Make the split easily closable
-    vim.command("nnoremap <silent> <buffer> q :bwipe<CR>")
-    vim.command("nnoremap <silent> <buffer> <enter> :bwipe<CR>")
-
-    # Remove cursorline in original window if it was this split which set it
-    if cursorline_activated_in_window is not None:
-        vim.command("au BufLeave,BufDelete,BufWipeout <buffer> "
-                    + get_var('taskwiki_py') +
-                    " vim.windows[{0}].options['cursorline']=False"
-                    .format(cursorline_activated_in_window))
-
-    if ANSI_ESC_AVAILABLE:
+    with CommandBatch() as batch:
+        batch.command("setlocal noswapfile")
+        batch.command("setlocal modifiable")
+        batch.command("call append(0, {0})".format(vim_literal(lines)))
+
+        batch.command("setlocal readonly")
+        batch.command("setlocal nomodifiable")
+        batch.command("setlocal buftype=nofile")
+        batch.command("setlocal nowrap")
+        batch.command("setlocal nonumber")
+
+        # Keep window size fixed despite resizing
+        batch.command("setlocal winfixheight")
+        batch.command("setlocal winfixwidth")
+
+        # Make the split easily closable
+        batch.command("nnoremap <silent> <buffer> q :bwipe<CR>")
+        batch.command("nnoremap <silent> <buffer> <enter> :bwipe<CR>")
+
+        # Remove cursorline in original window if it was this split which set it
+        if cursorline_activated_in_window is not None:
+            batch.command("au BufLeave,BufDelete,BufWipeout <buffer> "
+                          + get_var('taskwiki_py') +
+                          " vim.windows[{0}].options['cursorline']=False"
+                          .format(cursorline_activated_in_window))
+
+    if ANSI_ESC_AVAILABLE and ansi_esc:
         vim.command("AnsiEsc")
 
-def tw_execute_colorful(tw, *args, **kwargs):
-    override = kwargs.setdefault('config_override', {})
-    maxwidth = kwargs.pop('maxwidth', False)
-    maxheight = kwargs.pop('maxheight', False)
+    return vim.current.buffer.number
 
+def colorful_override(override, maxwidth=False, maxheight=False):
     if ANSI_ESC_AVAILABLE:
         override['_forcecolor'] = "yes"
 
@@ -323,6 +373,15 @@ def tw_execute_colorful(tw, *args, **kwargs):
     if maxwidth:
         override['defaultwidth'] = vim.current.window.width
 
+    return override
+
+def tw_execute_colorful(tw, *args, **kwargs):
+    override = kwargs.setdefault('config_override', {})
+    maxwidth = kwargs.pop('maxwidth', False)
+    maxheight = kwargs.pop('maxheight', False)
+
+    colorful_override(override, maxwidth, maxheight)
+
     return tw_execute_safely(tw, *args, **kwargs)
 
 def tw_execute_safely(tw, *args, **kwargs):
@@ -342,6 +401,261 @@ def tw_execute_safely(tw, *args, **kwargs):
         if err:
             print(err[-1], file=sys.stderr)
 
+def tw_export_data(tw, args):
+    """
+    Exports the tasks matching the given filter args from TaskWarrior.
+    Returns a list of raw dicts, as contained in the TaskWarrior export.
+    """
+
+    tw.enforce_recurrence()
+
+    return [
+        json.loads(line.strip(','))
+        for line in tw.execute_command(list(args) + ['export'])
+        if line
+    ]
+
+# Protected access is ok in the helpers below, tasklib has no public way to
+# load exported data, list the UUIDs of a lazy set without loading the tasks,
+# or assign the UUID of a new task
+# pylint: disable=W0212
+
+def task_from_data(tw, data):
+    """
+    Creates a Task object out of the raw dict from the TaskWarrior export.
+    """
+
+    task = tasklib.Task(tw)
+    task._load_data(data)
+    return task
+
+def dependency_uuids(task):
+    """
+    Returns the UUIDs of the tasks the given task depends on, without
+    loading the tasks from TaskWarrior.
+    """
+
+    depends = task['depends']
+
+    if isinstance(depends, tasklib.lazy.LazyUUIDTaskSet):
+        return set(depends._uuids)
+
+    return set(
+        dependency['uuid'] for dependency in depends or []
+        if dependency['uuid']
+    )
+
+def unsaved_dependencies(task):
+    """
+    Returns the tasks the given task depends on that have no UUID yet. These
+    can be identified only by the Task objects themselves.
+    """
+
+    depends = task['depends']
+
+    if isinstance(depends, tasklib.lazy.LazyUUIDTaskSet):
+        return []
+
+    return [
+        dependency for dependency in depends or []
+        if not dependency['uuid']
+    ]
+
+def assign_uuid(task):
+    """
+    Assigns a new UUID to the task that is not created yet, so that it can be
+    referenced before it is imported into TaskWarrior.
+    """
+
+    task._data['uuid'] = str(uuid.uuid4())
+
+def import_data(task):
+    """
+    Serializes the task for the import. Tags and dependencies are written as
+    JSON arrays, the only form all TaskWarrior versions accept, instead of
+    the comma separated strings tasklib uses.
+    """
+
+    data = json.loads(task.export_data())
+
+    for key in ('tags', 'depends'):
+        if data.get(key):
+            data[key] = data[key].split(',')
+
+    return json.dumps(data, separators=(',', ':'))
+
+def tw_export(tw, args):
+    """
+    Exports the tasks matching the given filter args from TaskWarrior.
+
+    Returns a list of (data, task) tuples, where data is the raw dict from
+    the TaskWarrior export and task is the corresponding Task object.
+    """
+
+    return [(data, task_from_data(tw, data))
+            for data in tw_export_data(tw, args)]
+
+
+def tw_import(tw, tasks):
+    """
+    Creates the given tasks, which need to have their UUIDs already assigned,
+    using a single import command. Tasks are refreshed afterwards, since hooks
+    may have altered their data.
+    """
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        f.write('[' + ','.join(import_data(task) for task in tasks) + ']')
+
+    try:
+        tw.execute_command(['import', f.name])
+    finally:
+        os.remove(f.name)
+
+    uuids = [task['uuid'] for task in tasks]
+    data = dict()
+
+    for i in range(0, len(uuids), constants.UUID_CHUNK_SIZE):
+        chunk = uuids[i:i + constants.UUID_CHUNK_SIZE]
+        data.update((item['uuid'], item) for item in tw_export_data(tw, chunk))
+
+    for task in tasks:
+        if task['uuid'] in data:
+            task._load_data(data[task['uuid']])
+
+# pylint: enable=W0212
+
+
+def unique_line_anchors(old, new):
+    """
+    Returns the pairs of positions (old, new) of the lines that occur exactly
+    once in both versions, keeping only the longest chain of pairs that is
+    ordered in both, as patience diff does.
+    """
+
+    positions = dict()
+
+    for i, line in enumerate(old):
+        entry = positions.setdefault(line, [0, 0, i, None])
+        entry[0] += 1
+
+    for i, line in enumerate(new):
+        entry = positions.get(line)
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = i
+
+    pairs = sorted(
+        (entry[2], entry[3]) for entry in positions.values()
+        if entry[0] == 1 and entry[1] == 1
+    )
+
+    # Longest increasing subsequence of the new positions, by patience
+    # sorting. Tails holds the last pair of the best chain of each length.
+    tails, tail_positions, previous = [], [], []
+
+    for index, (_, b) in enumerate(pairs):
+        length = bisect.bisect_left(tail_positions, b)
+        previous.append(tails[length - 1] if length else None)
+
+        if length == len(tails):
+            tails.append(index)
+            tail_positions.append(b)
+        else:
+            tails[length] = index
+            tail_positions[length] = b
+
+    anchors = []
+    index = tails[-1] if tails else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+
+    return anchors[::-1]
+
+
+def matching_lines(old, new):
+    """
+    Returns the pairs of positions (old, new) of the lines considered
+    unchanged, in linear time. The lines unique in both versions anchor the
+    match, which extends over the equal lines next to them. Gaps of the same
+    size in both versions are compared line by line, which covers lines
+    edited in place.
+    """
+
+    pairs = []
+    old_position, new_position = 0, 0
+
+    for old_anchor, new_anchor in unique_line_anchors(old, new) + [(len(old), len(new))]:
+        # Extend the match forward from the previous anchor
+        while (old_position < old_anchor and new_position < new_anchor and
+               old[old_position] == new[new_position]):
+            pairs.append((old_position, new_position))
+            old_position += 1
+            new_position += 1
+
+        # And backward from the next one
+        old_end, new_end = old_anchor, new_anchor
+        while (old_end > old_position and new_end > new_position and
+               old[old_end - 1] == new[new_end - 1]):
+            old_end -= 1
+            new_end -= 1
+
+        if old_end - old_position == new_end - new_position:
+            pairs += [
+                (old_position + offset, new_position + offset)
+                for offset in range(old_end - old_position)
+                if old[old_position + offset] == new[new_position + offset]
+            ]
+
+        pairs += [
+            (old_end + offset, new_end + offset)
+            for offset in range(old_anchor - old_end)
+        ]
+
+        if old_anchor < len(old):
+            pairs.append((old_anchor, new_anchor))
+
+        old_position, new_position = old_anchor + 1, new_anchor + 1
+
+    return pairs
+
+
+def unchanged_line_blocks(old, new):
+    """
+    Compares two versions of the buffer content. Returns the list of blocks
+    of lines present in both, as tuples (old_start, new_start, size).
+    """
+
+    blocks = []
+
+    for a, b in matching_lines(old, new):
+        if blocks and blocks[-1][0] + blocks[-1][2] == a and blocks[-1][1] + blocks[-1][2] == b:
+            blocks[-1][2] += 1
+        else:
+            blocks.append([a, b, 1])
+
+    return [tuple(block) for block in blocks]
+
+
+def changed_line_hunks(old, new):
+    """
+    Compares two versions of the buffer content. Returns the list of ranges
+    that differ, as tuples (old_start, old_end, new_start, new_end).
+    """
+
+    hunks = []
+    old_position, new_position = 0, 0
+    blocks = unchanged_line_blocks(old, new) + [(len(old), len(new), 0)]
+
+    for old_start, new_start, size in blocks:
+        if old_position < old_start or new_position < new_start:
+            hunks.append((old_position, old_start, new_position, new_start))
+
+        old_position, new_position = old_start + size, new_start + size
+
+    return hunks
+
+
 @contextlib.contextmanager
 def current_line_highlighted():
     original_value = vim.current.window.options['cursorline']
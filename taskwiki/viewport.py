@@ -1,4 +1,3 @@
-import itertools
 import re
 import six
 import sys
@@ -6,6 +5,8 @@ import sys
 from taskwiki import vwtask
 from taskwiki import regexp
 from taskwiki import errors
+from taskwiki import filtering
+from taskwiki import outline
 from taskwiki import util
 from taskwiki import sort
 from taskwiki import short
@@ -88,7 +89,7 @@ class ViewPort(object):
         # Get the initial version of the taskfilter args
         taskfilter_args = list(constants.DEFAULT_VIEWPORT_VIRTUAL_TAGS)
         if use_presets:
-            taskfilter_args += list(preset.PresetHeader.from_line(self.line_number, self.cache).taskfilter)
+            taskfilter_args += list(self.cache.presets[self.line_number].taskfilter)
         taskfilter_args += "("
         taskfilter_args += util.tw_modstring_to_args(filterstring)
         taskfilter_args += ")"
@@ -260,18 +261,12 @@ class ViewPort(object):
 
     @classmethod
     def find_closest(cls, cache):
-        current_line = util.get_current_line_number()
-
         # Search lines in order: first all above, than all below
-        line_numbers = itertools.chain(
-            reversed(range(0, current_line + 1)),
-            range(current_line + 1, len(cache.buffer))
-            )
+        current_line = util.get_current_line_number()
+        i = outline.closest(cache.outline.viewport_lines, current_line)
 
-        for i in line_numbers:
-            port = cls.from_line(i, cache)
-            if port:
-                return port
+        if i is not None:
+            return cls.from_line(i, cache)
 
     @property
     def raw_filter(self):
@@ -291,14 +286,23 @@ class ViewPort(object):
         return set(t.task for t in self.tasks)
 
     @property
-    def matching_tasks(self):
+    def filtered_tasks(self):
+        # Evaluate the filter over the tasks exported for all the viewports
+        # in the buffer at once, if possible
+        snapshot = self.cache.snapshot[self.tw]
+        if snapshot is not None and snapshot.covers(self.taskfilter):
+            return snapshot.filter(self.taskfilter)
+
         # Split the filter into CLI tokens and filter by the expression
         # By default, do not list deleted tasks
-        args = self.taskfilter
+        return self.tw.tasks.filter(*self.taskfilter)
+
+    @property
+    def matching_tasks(self):
         # Visibility tag not set
         if self.meta.get('visible') is None:
             return set(
-                task for task in self.tw.tasks.filter(*args)
+                task for task in self.filtered_tasks
             )
         # -VISIBLE virtual tag used
         elif self.meta.get('visible') is False:
@@ -313,7 +317,7 @@ class ViewPort(object):
             # Return only those that are not duplicated outside
             # of the viewport
             return set(
-                task for task in self.tw.tasks.filter(*args)
+                task for task in self.filtered_tasks
                 if task not in tasks_outside_viewport
             )
 
@@ -349,6 +353,7 @@ class ViewPort(object):
         to_add, to_del = self.get_tasks_to_add_and_del()
 
         # Remove tasks that no longer match the filter
+        lines_to_remove = []
         for task in to_del:
             # Find matching vimwikitasks in the self.tasks set
 
@@ -367,10 +372,15 @@ class ViewPort(object):
                     if t.task == task
                 ]
 
-            # Remove the tasks from viewport's set and from buffer
+            # Remove the tasks from viewport's set
             for vimwikitask in matching_vimwikitasks:
                 self.tasks.remove(vimwikitask)
-                self.cache.remove_line(vimwikitask['line_number'])
+                lines_to_remove.append(vimwikitask['line_number'])
+
+        # Remove the lines from the buffer, from the bottom up, so that the
+        # line numbers of the remaining ones are not affected
+        for line in sorted(lines_to_remove, reverse=True):
+            self.cache.remove_line(line)
 
         # Add the tasks that match the filter and are not listed
         added_tasks = 0
@@ -1,11 +1,11 @@
 import re
 import six
-import itertools
 import vim  # pylint: disable=F0401
 from datetime import datetime
 
 from tasklib import Task
 
+from taskwiki import outline
 from taskwiki import regexp
 from taskwiki import util
 from taskwiki.short import ShortUUID
@@ -36,6 +36,10 @@ class VimwikiTask(object):
         self.uuid = ShortUUID(uuid, self.tw) if uuid is not None else None
 
     def __getitem__(self, key):
+        # Line numbers are kept up to date by the store lazily
+        if key == 'line_number':
+            self.cache.vwtask.update_line_numbers()
+
         if key in self.vim_data.keys():
             return self.vim_data[key]
         else:
@@ -55,18 +59,12 @@ class VimwikiTask(object):
 
     @classmethod
     def find_closest(cls, cache):
-        current_line = util.get_current_line_number()
-
         # Search lines in order: first all above, than all below
-        line_numbers = itertools.chain(
-            reversed(range(0, current_line + 1)),
-            range(current_line + 1, len(cache.buffer))
-            )
+        current_line = util.get_current_line_number()
+        i = outline.closest(cache.outline.task_lines, current_line)
 
-        for i in line_numbers:
-            vwtask = cls.from_line(cache, i)
-            if vwtask:
-                return vwtask
+        if i is not None:
+            return cls.from_line(cache, i)
 
     @classmethod
     def parse_line(cls, cache, number):
@@ -247,7 +245,22 @@ class VimwikiTask(object):
     def priority_to_tw_format(self):
         return convert_priority_to_tw_format(self['priority'])
 
-    def save_to_tw(self):
+    @property
+    def importable(self):
+        """
+        Determines whether the task can be created by the bulk import. This
+        holds for new tasks, unless they are recurring, since TaskWarrior
+        creates the recurrence template only when the task is added, or they
+        depend on a task that cannot be imported.
+        """
+
+        return (
+            not self.uuid and
+            not self.task['recur'] and
+            all(s.uuid or s.importable for s in self.add_dependencies)
+        )
+
+    def update_dependencies(self):
         # This method persumes all the dependencies have been created at the
         # point it was called, hence move set the dependencies for the underlying
         # task. Remove dependencies for all other tasks within the viewport.
@@ -261,20 +274,25 @@ class VimwikiTask(object):
 
         self.task['depends'] |= set(s.task for s in self.add_dependencies)
 
+    def save_to_tw(self):
+        self.update_dependencies()
+
         # Push the values to the Task only if the Vimwiki representation
         # somehow differs
         if self.task.modified or not self.uuid:
             self.task.save()
+            self.update_after_save()
 
-            # If task was first time saved now, add it to the cache and remove
-            # the temporary reference
-            if self.__unsaved_task is not None:
-                self.uuid = ShortUUID(self.__unsaved_task['uuid'], self.tw)
-                self.cache.task[self.uuid] = self.__unsaved_task
-                self.__unsaved_task = None
+    def update_after_save(self):
+        # If task was first time saved now, add it to the cache and remove
+        # the temporary reference
+        if self.__unsaved_task is not None:
+            self.uuid = ShortUUID(self.__unsaved_task['uuid'], self.tw)
+            self.cache.task[self.uuid] = self.__unsaved_task
+            self.__unsaved_task = None
 
-            # If we saved the task, we need to update. Hooks may have changed data.
-            self.update_from_task()
+        # If we saved the task, we need to update. Hooks may have changed data.
+        self.update_from_task()
 
     def get_completed_mark(self):
         mark = self['completed_mark']
@@ -345,32 +363,17 @@ class VimwikiTask(object):
         if not self['indent']:
             return None
 
-        for i in reversed(range(0, self['line_number'])):
-            # Tab is equal to four spaces
-            # TODO: Source this from tabstop setting, but this would be only
-            # useful for mixed tab/space indentations
-            indentation = len(self.cache.buffer[i].replace('\t', '    ')) - len(self.cache.buffer[i].lstrip())
-            indent = self['indent'].replace('\t', '    ')
-
-            if indentation < len(indent):
-                # The from_line constructor returns None if line doesn't match a task
-                line = self.cache.line[(VimwikiTask, i)]
-                if line:
-                    # Stop looking, we found a less-indented task
-                    return self.cache.vwtask[i]
-                else:
-                    return None
+        line = self.cache.outline.parents.get(self['line_number'])
+        if line is not None:
+            return self.cache.vwtask[line]
 
     def apply_defaults(self):
-        from taskwiki import viewport, preset
-
         # Find first parent header or viewport
         header, port = None, None
-        for i in reversed(range(0, self['line_number'])):
-            header = preset.PresetHeader.from_line(i, self.cache)
-            port = viewport.ViewPort.from_line(i, self.cache)
-            if header or port:
-                break
+        i = self.cache.outline.enclosing_header(self['line_number'])
+        if i is not None:
+            header = self.cache.presets[i]
+            port = self.cache.viewport[i]
 
         if header:
             # Use defaults from the preset header hierarchy
@@ -336,6 +336,7 @@ class MockVim(object):
 
 
 class MockBuffer(object):
+    buffer_number = 0
 
     def __init__(self):
         self.data = ['']
@@ -376,14 +377,17 @@ class MockBuffer(object):
 class MockCache(object):
     warriors = {'default': 'default'}
     buffer_has_authority = True
+    markup_syntax = 'default'
 
     def __init__(self):
-        from taskwiki import store
+        from taskwiki import outline, store
         self.buffer = MockBuffer()
         self.line = store.LineStore(self)
-        self.vwtask = dict()
+        self.outline = outline.Outline(self)
+        self.vwtask = store.VwtaskStore(self)
         self.task = dict()
-        self.viewport = dict()
+        self.presets = store.PresetStore(self)
+        self.viewport = store.ViewportStore(self)
 
     def reset(self):
         self.warriors.clear()
@@ -0,0 +1,392 @@
+import json
+import sys
+import threading
+import time
+import pytest
+from tests.base import MockVim, MockCache
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki.cache import BackgroundSave, BufferProxy, CacheRegistry, TaskCache
+from taskwiki.errors import TaskWikiException
+
+
+class DependencyTask(dict):
+    def __init__(self, line_number):
+        super(DependencyTask, self).__init__(line_number=line_number)
+        self.add_dependencies = set()
+
+    def __hash__(self):
+        return self['line_number']
+
+
+class TestDependencyOrder(object):
+    def setup(self):
+        self.cache = MockCache()
+
+    def teardown(self):
+        self.cache.reset()
+
+    def order(self):
+        tasks = TaskCache.vimwikitask_dependency_order.fget(self.cache)
+        return [task['line_number'] for task in tasks]
+
+    def add_tasks(self, count):
+        for i in range(count):
+            self.cache.vwtask[i] = DependencyTask(i)
+
+    def test_independent(self):
+        self.add_tasks(3)
+        assert self.order() == [0, 1, 2]
+
+    def test_dependencies_first(self):
+        # Task on line 0 depends on 1 and 2, task on line 1 depends on 3
+        self.add_tasks(4)
+        self.cache.vwtask[0].add_dependencies = set([self.cache.vwtask[1], self.cache.vwtask[2]])
+        self.cache.vwtask[1].add_dependencies = set([self.cache.vwtask[3]])
+
+        order = self.order()
+        assert sorted(order) == [0, 1, 2, 3]
+        assert order.index(3) < order.index(1) < order.index(0)
+        assert order.index(2) < order.index(0)
+
+    def test_cycle(self):
+        self.add_tasks(3)
+        self.cache.vwtask[0].add_dependencies = set([self.cache.vwtask[1]])
+        self.cache.vwtask[1].add_dependencies = set([self.cache.vwtask[0]])
+
+        with pytest.raises(TaskWikiException) as exc:
+            self.order()
+
+        assert "lines 1, 2" in str(exc.value)
+
+
+class NumberedTask(dict):
+    @property
+    def vim_data(self):
+        return self
+
+
+class TestVwtaskStore(object):
+    def setup(self):
+        self.cache = MockCache()
+        self.store = self.cache.vwtask
+        self.tasks = [NumberedTask(line_number=i) for i in range(3)]
+
+        for i, task in enumerate(self.tasks):
+            self.store[i] = task
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_insert(self):
+        self.store.shift(1, 1)
+        assert self.store.store == [self.tasks[0], None, self.tasks[1], self.tasks[2]]
+
+        # Line numbers are updated only once requested
+        assert self.tasks[2]['line_number'] == 2
+        self.store.update_line_numbers()
+        assert [t['line_number'] for t in self.tasks] == [0, 2, 3]
+
+    def test_remove(self):
+        del self.store[0]
+        self.store.shift(0, -1)
+        self.store.update_line_numbers()
+
+        assert self.store.items() == [(0, self.tasks[1]), (1, self.tasks[2])]
+        assert [t['line_number'] for t in self.tasks[1:]] == [0, 1]
+
+    def test_swap(self):
+        self.store.swap(0, 2)
+        assert self.store.values() == [self.tasks[2], self.tasks[1], self.tasks[0]]
+        assert self.tasks[0]['line_number'] == 2
+
+
+class TestReorderLines(object):
+    def setup(self):
+        from taskwiki import store
+        from taskwiki.vwtask import VimwikiTask
+
+        self.cache = MockCache()
+        self.cache.viewport = store.ViewportStore(self.cache)
+        self.cache.buffer.data = ["Header", "* [ ] A", "* [ ] B", "* [ ] C"]
+        self.VimwikiTask = VimwikiTask
+
+        self.matches = [self.cache.line[(VimwikiTask, i)] for i in range(4)]
+        self.tasks = [NumberedTask(line_number=i) for i in range(4)]
+        for i in range(1, 4):
+            self.cache.vwtask[i] = self.tasks[i]
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_reorder(self):
+        TaskCache.reorder_lines(self.cache, 1, [3, 1, 2])
+
+        assert self.cache.buffer.data == ["Header", "* [ ] C", "* [ ] A", "* [ ] B"]
+        assert self.cache.line[(self.VimwikiTask, 1)] is self.matches[3]
+        assert self.cache.vwtask[1] is self.tasks[3]
+        assert [t['line_number'] for t in self.tasks[1:]] == [2, 3, 1]
+
+    def test_swap(self):
+        TaskCache.swap_lines(self.cache, 1, 3)
+
+        assert self.cache.buffer.data == ["Header", "* [ ] C", "* [ ] B", "* [ ] A"]
+        assert self.cache.line[(self.VimwikiTask, 3)] is self.matches[1]
+        assert self.cache.vwtask[3] is self.tasks[1]
+
+
+class NumberedBuffer(list):
+    def __init__(self, number):
+        super(NumberedBuffer, self).__init__([''])
+        self.number = number
+
+
+class ResetCountingCache(object):
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+class TestCacheRegistry(object):
+    def setup(self):
+        self.registry = CacheRegistry()
+        self.cache = ResetCountingCache()
+        self.registry.caches[1] = self.cache
+
+    def teardown(self):
+        sys.modules['vim'].reset()
+
+    def test_reset_current(self):
+        sys.modules['vim'].current.buffer = NumberedBuffer(1)
+        self.registry.reset_current()
+        assert self.cache.resets == 1
+        assert self.registry.current_buffer == 1
+
+    def test_reset_current_not_loaded(self):
+        sys.modules['vim'].current.buffer = NumberedBuffer(2)
+        self.registry.reset_current()
+        assert self.cache.resets == 0
+        assert list(self.registry.caches) == [1]
+
+    def test_lazy_current_buffer(self):
+        sys.modules['vim'].current.buffer = NumberedBuffer(1)
+        assert self.registry() is self.cache
+        assert self.registry.current_buffer == 1
+
+
+class MockWindow(object):
+    def __init__(self, row):
+        self.cursor = (row, 0)
+
+
+class TestRelevantTw(object):
+    def setup(self):
+        self.cache = MockCache()
+        self.cache.relevant_warriors = dict()
+        self.cache.warriors.update({'H': 'home'})
+        self.cache.buffer.data = [
+            '* [ ] Default task',
+            '* [ ] Home task  #H:12345678',
+            '',
+        ]
+        sys.modules['vim'].current.window = MockWindow(3)
+
+    def teardown(self):
+        self.cache.reset()
+        del sys.modules['vim'].current.window
+
+    def test_source(self):
+        assert TaskCache.get_relevant_tw(self.cache) == 'home'
+
+        sys.modules['vim'].current.window = MockWindow(1)
+        assert TaskCache.get_relevant_tw(self.cache) == 'default'
+
+    def test_memoized(self):
+        TaskCache.get_relevant_tw(self.cache)
+
+        # The buffer did not change, the tasks need not be found again
+        self.cache.outline = None
+        assert TaskCache.get_relevant_tw(self.cache) == 'home'
+
+    def test_no_tasks(self):
+        self.cache.buffer.data = ['']
+        assert TaskCache.get_relevant_tw(self.cache) == 'default'
+
+
+class ExportingTW(object):
+    def __init__(self, uuids):
+        self.tasks = [{'uuid': uuid, 'description': 'Task'} for uuid in uuids]
+        self.commands = []
+
+    def enforce_recurrence(self):
+        pass
+
+    def execute_command(self, args):
+        self.commands.append(args)
+        return [json.dumps(task) for task in self.tasks if task['uuid'] in args]
+
+
+class NoSnapshots(object):
+    def __init__(self):
+        self.threads = []
+
+    def __getitem__(self, tw):
+        self.threads.append(threading.current_thread())
+        return None
+
+
+class VimBuffer(object):
+    def __init__(self, number):
+        self.number = number
+        self.vars = dict()
+
+
+class TestLoadTasks(object):
+    def setup(self):
+        from taskwiki import constants, store, util
+
+        self.constants, self.util = constants, util
+        self.chunk_size = constants.UUID_CHUNK_SIZE
+        constants.UUID_CHUNK_SIZE = 2
+
+        self.uuids = ['{0}234567{0}'.format(i) for i in range(5)]
+        self.tw = ExportingTW(self.uuids)
+
+        self.cache = MockCache()
+        self.cache.warriors['default'] = self.tw
+        self.cache.snapshot = NoSnapshots()
+        self.cache.task = store.TaskStore(self.cache)
+        self.cache.timings = dict()
+        self.cache.record_timing = lambda *args: TaskCache.record_timing(self.cache, *args)
+        self.cache.buffer.data = ['* [ ] Task  #' + uuid for uuid in self.uuids]
+        self.cache.buffer.data += ['* [ ] Duplicate  #' + self.uuids[0], '* [ ] New task']
+
+        self.vim_buffer = VimBuffer(self.cache.buffer.buffer_number)
+        util.vim.buffers = [self.vim_buffer]
+
+    def teardown(self):
+        self.constants.UUID_CHUNK_SIZE = self.chunk_size
+        del self.util.vim.buffers
+        self.cache.reset()
+
+    def test_chunked_export(self):
+        TaskCache.load_tasks(self.cache)
+
+        assert self.tw.commands == [
+            self.uuids[0:2] + ['export'],
+            self.uuids[2:4] + ['export'],
+            self.uuids[4:5] + ['export'],
+        ]
+        assert sorted(str(key) for key in self.cache.task.store) == self.uuids
+
+    def test_timings(self):
+        TaskCache.load_tasks(self.cache)
+
+        timings = self.vim_buffer.vars['taskwiki_timings']
+        assert list(timings) == ['load_tasks']
+        assert timings['load_tasks']['count'] == 5
+        assert timings['load_tasks']['milliseconds'] >= 0
+
+    def test_multiple_warriors(self):
+        home = ExportingTW(['abcdef01'])
+        self.cache.warriors['H'] = home
+        self.cache.buffer.data.append('* [ ] Home task  #H:abcdef01')
+
+        TaskCache.load_tasks(self.cache)
+
+        assert home.commands == [['abcdef01', 'export']]
+        assert len(self.cache.task.store) == 6
+
+        # The snapshots are resolved on the main thread only
+        assert self.cache.snapshot.threads == [threading.current_thread()] * 2
+
+
+class LazyVwtask(object):
+    def __init__(self):
+        self.loaded_in = None
+
+    @property
+    def task(self):
+        if self.loaded_in is None:
+            self.loaded_in = threading.current_thread()
+        return 'task'
+
+
+class TestBackgroundSave(object):
+    def setup(self):
+        self.cache = MockCache()
+        self.vwtasks = [LazyVwtask(), LazyVwtask()]
+        for i, vwtask in enumerate(self.vwtasks):
+            self.cache.vwtask[i] = vwtask
+
+        self.cache.save_tasks = lambda: [vwtask.task for vwtask in self.vwtasks]
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_tasks_loaded_on_main_thread(self):
+        job = BackgroundSave(self.cache)
+        job.start()
+        job.thread.join()
+
+        assert job.error is None
+        assert [v.loaded_in for v in self.vwtasks] == [threading.current_thread()] * 2
+
+
+class EditableVimBuffer(VimBuffer):
+    def __init__(self, number, lines):
+        super(EditableVimBuffer, self).__init__(number)
+        self.lines = list(lines)
+        self.options = dict()
+        self.writes = 0
+
+    def __getitem__(self, index):
+        return self.lines[index]
+
+    def __setitem__(self, index, lines):
+        self.writes += 1
+        self.lines[index] = lines
+
+
+class TestBufferPush(object):
+    def setup(self):
+        from taskwiki import util
+
+        self.util = util
+        self.lines = []
+        for i in range(5000):
+            self.lines += ['* [ ] Task {0}'.format(i), '']
+
+        self.vim_buffer = EditableVimBuffer(1, self.lines)
+        util.vim.buffers = [self.vim_buffer]
+        util.vim.current.window = MockWindow(1)
+        util.vim.command = lambda command: None
+
+        self.proxy = BufferProxy(1)
+        self.proxy.obtain()
+
+    def teardown(self):
+        del self.util.vim.buffers
+        del self.util.vim.current.window
+        del self.util.vim.command
+
+    def test_unchanged(self):
+        self.proxy.push()
+        assert self.vim_buffer.writes == 0
+        assert 'modified' not in self.vim_buffer.options
+
+    def test_large_edit(self):
+        # Every other task toggled, only the toggled lines are written
+        for line in range(0, len(self.lines), 4):
+            self.proxy[line] = self.proxy[line].replace('[ ]', '[X]')
+
+        start = time.time()
+        self.proxy.push()
+        assert time.time() - start < 1
+
+        assert self.vim_buffer.writes == 2500
+        assert self.vim_buffer.lines == self.proxy.data
+        assert self.vim_buffer.options['modified']
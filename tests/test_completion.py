@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+
+from tests.base import IntegrationTest, MockVim
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki import completion
 from taskwiki.completion import Completion
-from tests.base import IntegrationTest
 
 
 class FakeTW():
@@ -8,8 +16,11 @@ class FakeTW():
         self.version = '2.5.1'
         self.projects = projects
         self.tags = tags
+        self.calls = 0
+        self.overrides = {'data.location': tempfile.mkdtemp(dir='/tmp/')}
 
     def execute_command(self, args):
+        self.calls += 1
         if args == ["_unique", "project"]:
             return self.projects
         elif args == ["_unique", "tag"]:
@@ -65,6 +76,45 @@ class TestCompletionUnit():
         assert c.omni_modstring_findstart("* [ ] x -- x y") == 13
 
 
+class TestCompletionIndex():
+    def setup(self):
+        completion.shared.clear()
+
+    def teardown(self):
+        completion.shared.clear()
+
+    def test_prefixed(self):
+        words = ["a", "ab", "abc", "b", "ba"]
+        assert completion.prefixed(words, "ab") == ["ab", "abc"]
+        assert completion.prefixed(words, "") == words
+        assert completion.prefixed(words, "c") == []
+
+    def test_warm_up(self):
+        tw = FakeTW(projects=["aa"])
+        c = Completion(tw)
+        c.warm_up()
+        assert c.modify("proj:") == ["proj:aa"]
+        assert tw.calls == 3
+
+    def test_shared(self):
+        tw = FakeTW(projects=["aa"])
+        c = completion.get_completion(tw)
+        assert completion.get_completion(tw) is c
+
+        c.modify("proj:")
+        assert completion.get_completion(tw)._projects() == ["aa"]
+        assert tw.calls == 1
+
+    def test_data_change(self):
+        tw = FakeTW()
+        c = completion.get_completion(tw)
+
+        with open(os.path.join(tw.overrides['data.location'], 'pending.data'), 'w') as f:
+            f.write('[description:"test"]\n')
+
+        assert completion.get_completion(tw) is not c
+
+
 class TestCompletionIntegMod(IntegrationTest):
     viminput = """
     * [ ] test task 1  #{uuid}
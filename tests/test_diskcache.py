@@ -0,0 +1,206 @@
+import os
+import sys
+import tempfile
+
+from tests.base import MockVim
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki import diskcache, store
+
+
+class TestDiskCache(object):
+    def setup(self):
+        self.dir = tempfile.mkdtemp(dir='/tmp/')
+        sys.modules['vim'].vars['taskwiki_cache_location'] = self.dir
+        diskcache.loaded.clear()
+
+    def teardown(self):
+        sys.modules['vim'].reset()
+        diskcache.loaded.clear()
+
+    def test_disabled(self):
+        sys.modules['vim'].vars.clear()
+        assert not diskcache.enabled()
+
+    def test_roundtrip(self):
+        diskcache.save('snapshot', 'key', [['file', 1, 2]], [{'uuid': 'a'}])
+
+        # Read the entry from the disk, not from memory
+        diskcache.loaded.clear()
+        assert diskcache.load('snapshot', 'key', [['file', 1, 2]]) == [{'uuid': 'a'}]
+
+    def test_signature_mismatch(self):
+        diskcache.save('snapshot', 'key', [['file', 1, 2]], [{'uuid': 'a'}])
+        assert diskcache.load('snapshot', 'key', [['file', 1, 3]]) is None
+
+    def test_missing_entry(self):
+        assert diskcache.load('snapshot', 'other', []) is None
+
+    def test_file_signature(self):
+        path = os.path.join(self.dir, 'pending.data')
+        missing = os.path.join(self.dir, 'completed.data')
+
+        assert diskcache.file_signature([path, missing]) == []
+
+        with open(path, 'w') as f:
+            f.write('data')
+
+        signature = diskcache.file_signature([path, missing])
+        assert len(signature) == 1
+
+        with open(path, 'a') as f:
+            f.write('more data')
+
+        assert diskcache.file_signature([path, missing]) != signature
+
+
+class TestTaskrcFiles(object):
+    def setup(self):
+        self.dir = tempfile.mkdtemp(dir='/tmp/')
+        self.taskrc = self.write('taskrc', 'include themes/dark.theme\n')
+        os.mkdir(os.path.join(self.dir, 'themes'))
+        self.theme = self.write('themes/dark.theme', 'include ../taskrc\n')
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_includes(self):
+        assert diskcache.taskrc_files(self.taskrc) == [self.taskrc, self.theme]
+
+    def test_missing_include(self):
+        self.write('taskrc', 'include missing.theme\n')
+        missing = os.path.join(self.dir, 'missing.theme')
+        assert diskcache.taskrc_files(self.taskrc) == [self.taskrc, missing]
+
+
+class TestConfigCache(object):
+    def setup(self):
+        self.dir = tempfile.mkdtemp(dir='/tmp/')
+        self.taskrc = os.path.join(self.dir, 'taskrc')
+        with open(self.taskrc, 'w') as f:
+            f.write('default.command=next\n')
+
+        self.calls = 0
+        store.configs.clear()
+        diskcache.loaded.clear()
+
+    def teardown(self):
+        sys.modules['vim'].reset()
+        store.configs.clear()
+        diskcache.loaded.clear()
+
+    def warrior(self):
+        tw = store.CachedConfigTaskWarrior(
+            data_location=self.dir,
+            taskrc_location=self.taskrc,
+            version_override='2.6.0',
+        )
+
+        def execute_command(args, **kwargs):
+            self.calls += 1
+            return ['default.command next']
+
+        tw.execute_command = execute_command
+        return tw
+
+    def test_shared_between_instances(self):
+        assert self.warrior().config['default.command'] == 'next'
+        assert self.warrior().config['default.command'] == 'next'
+        assert self.calls == 1
+
+    def test_taskrc_change(self):
+        self.warrior().config
+        os.utime(self.taskrc, ns=(0, 0))
+        self.warrior().config
+        assert self.calls == 2
+
+    def test_persistent(self):
+        sys.modules['vim'].vars['taskwiki_cache_location'] = self.dir
+        self.warrior().config
+
+        # A new session has neither the shared nor the loaded entries
+        store.configs.clear()
+        diskcache.loaded.clear()
+
+        assert self.warrior().config['default.command'] == 'next'
+        assert self.calls == 1
+
+
+class TestSharedWarriors(object):
+    def setup(self):
+        self.dir = tempfile.mkdtemp(dir='/tmp/')
+        self.log = os.path.join(self.dir, 'calls')
+        self.task = os.path.join(self.dir, 'task')
+
+        # Fake task binary, which logs its calls
+        with open(self.task, 'w') as f:
+            f.write('#!/bin/sh\necho call >> {0}\necho 2.6.0\n'.format(self.log))
+        os.chmod(self.task, 0o755)
+
+        store.versions.clear()
+        store.version_checks.clear()
+        store.shared_warriors.clear()
+        diskcache.loaded.clear()
+
+    def teardown(self):
+        sys.modules['vim'].reset()
+        store.versions.clear()
+        store.version_checks.clear()
+        store.shared_warriors.clear()
+        diskcache.loaded.clear()
+
+    def calls(self):
+        with open(self.log) as f:
+            return len(f.readlines())
+
+    def warrior(self, **kwargs):
+        return store.get_warrior(
+            data_location=self.dir,
+            task_command=self.task,
+            **kwargs
+        )
+
+    def test_version(self):
+        assert store.task_version(self.task) == '2.6.0'
+        assert store.task_version(self.task) == '2.6.0'
+        assert self.calls() == 1
+
+    def test_missing_binary(self):
+        assert store.task_version(os.path.join(self.dir, 'missing')) is None
+
+    def test_background_version(self):
+        store.check_version(self.task)
+        store.check_version(self.task)
+        assert self.task in store.version_checks
+
+        assert store.task_version(self.task) == '2.6.0'
+        assert store.task_version(self.task) == '2.6.0'
+        assert not store.version_checks
+        assert self.calls() == 1
+
+    def test_background_version_known(self):
+        store.task_version(self.task)
+        store.check_version(self.task)
+        assert not store.version_checks
+
+    def test_persistent_version(self):
+        sys.modules['vim'].vars['taskwiki_cache_location'] = self.dir
+        store.task_version(self.task)
+
+        store.versions.clear()
+        diskcache.loaded.clear()
+
+        assert store.task_version(self.task) == '2.6.0'
+        assert self.calls() == 1
+
+    def test_shared(self):
+        tw = self.warrior(taskrc_location='~/.taskrc')
+        assert self.warrior(taskrc_location='~/.taskrc') is tw
+        assert self.warrior(taskrc_location='~/.other') is not tw
+        assert tw.version == '2.6.0'
+        assert tw.overrides['context'] == ''
+        assert self.calls() == 1
@@ -0,0 +1,194 @@
+import pytest
+from datetime import datetime, timedelta
+
+from taskwiki.filtering import (
+    compile_filter, to_export_format, TaskSnapshot, UnsupportedFilter
+)
+
+
+def local_date(days=0, hour=12):
+    dt = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+    return to_export_format(dt + timedelta(days=days))
+
+
+TASKS = [
+    {'uuid': '1', 'description': 'Home task', 'status': 'pending',
+     'project': 'Home', 'tags': ['chore']},
+    {'uuid': '2', 'description': 'Garden task', 'status': 'pending',
+     'project': 'Home.Garden'},
+    {'uuid': '3', 'description': 'Work task', 'status': 'completed',
+     'project': 'Work', 'tags': ['chore', 'office']},
+    {'uuid': '4', 'description': 'Deleted task', 'status': 'deleted'},
+    {'uuid': '5', 'description': 'Template', 'status': 'recurring',
+     'mask': '-', 'project': 'Home'},
+]
+
+
+def matching(args):
+    predicate = compile_filter(args)
+    return [task['uuid'] for task in TASKS if predicate(task)]
+
+
+class TestFilterEvaluation(object):
+    def test_empty(self):
+        assert matching([]) == ['1', '2', '3', '4', '5']
+
+    def test_project(self):
+        assert matching(['project:Home']) == ['1', '2', '5']
+        assert matching(['project:Home.Garden']) == ['2']
+
+    def test_empty_project(self):
+        assert matching(['project:']) == ['4']
+
+    def test_tags(self):
+        assert matching(['+chore']) == ['1', '3']
+        assert matching(['-chore']) == ['2', '4', '5']
+
+    def test_virtual_tags(self):
+        assert matching(['-DELETED', '-PARENT']) == ['1', '2', '3']
+        assert matching(['+COMPLETED']) == ['3']
+        assert matching(['+TAGGED']) == ['1', '3']
+
+    def test_default_viewport_filter(self):
+        args = ['-DELETED', '-PARENT', '(', 'project:Home', ')']
+        assert matching(args) == ['1', '2']
+
+    def test_or(self):
+        assert matching(['project:Work', 'or', 'project:Home.Garden']) == ['2', '3']
+
+    def test_and_precedence(self):
+        args = ['project:Work', 'or', 'project:Home', 'and', '-PARENT']
+        assert matching(args) == ['1', '2', '3']
+
+    def test_parentheses(self):
+        args = ['(', 'project:Work', 'or', 'project:Home', ')', '+chore']
+        assert matching(args) == ['1', '3']
+
+    def test_viewport_union(self):
+        args = [
+            '(', '-DELETED', '(', '+office', ')', ')',
+            'or',
+            '(', '-DELETED', '(', 'project:Home.Garden', ')', ')',
+        ]
+        assert matching(args) == ['2', '3']
+
+    @pytest.mark.parametrize('args', [
+        ['urgency.over:5'],
+        ['pro:Home'],
+        ['project.unknown:Home'],
+        ['due.before:3d'],
+        ['project.has:'],
+        ['description.has:foo.*bar'],
+        ['description.hasnt:a|b'],
+        ['project.startswith:(Home)'],
+        ['project.endswith:Garden$'],
+        ['due:eod'],
+        ['+UNKNOWNVIRTUAL'],
+        ['1'],
+        ['(', 'project:Home'],
+        ['project:Home', ')'],
+        ['project:Home', 'or'],
+        ['xor'],
+    ])
+    def test_unsupported(self, args):
+        with pytest.raises(UnsupportedFilter):
+            compile_filter(args)
+
+
+DATED_TASKS = [
+    {'uuid': '1', 'status': 'pending', 'due': local_date(-1)},
+    {'uuid': '2', 'status': 'pending', 'due': local_date(0)},
+    {'uuid': '3', 'status': 'pending', 'due': local_date(1)},
+    {'uuid': '4', 'status': 'completed', 'due': local_date(0),
+     'end': local_date(0)},
+    {'uuid': '5', 'status': 'pending', 'project': 'Home.Garden'},
+    {'uuid': '6', 'status': 'pending', 'wait': local_date(30),
+     'start': local_date(0)},
+]
+
+
+def matching_dated(args):
+    predicate = compile_filter(args)
+    return [task['uuid'] for task in DATED_TASKS if predicate(task)]
+
+
+class TestFilterModifiers(object):
+    def test_string_modifiers(self):
+        assert matching(['project.is:Home']) == ['1', '5']
+        assert matching(['project.isnt:Home']) == ['2', '3', '4']
+        assert matching(['project.not:Home']) == ['3', '4']
+        assert matching(['project.not:Home.Garden']) == ['1', '3', '4', '5']
+        assert matching(['description.has:task']) == ['1', '2', '3', '4']
+        assert matching(['description.hasnt:task']) == ['5']
+        assert matching(['project.endswith:Garden']) == ['2']
+        assert matching(['project.startswith:Wo']) == ['3']
+
+    def test_presence_modifiers(self):
+        assert matching(['project.none:']) == ['4']
+        assert matching(['project.any:']) == ['1', '2', '3', '5']
+        assert matching_dated(['due.any:', 'due.before:today']) == ['1']
+
+    def test_date_modifiers(self):
+        assert matching_dated(['due.before:today']) == ['1']
+        assert matching_dated(['due.after:tomorrow']) == ['3']
+        assert matching_dated(['due.by:eod']) == ['1', '2', '4']
+        assert matching_dated(['due:today']) == ['2', '4']
+        assert matching_dated(['end.after:yesterday']) == ['4']
+
+    def test_iso_dates(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        assert matching_dated(['due:' + today]) == ['2', '4']
+        assert matching_dated(['due.before:' + today + 'T00:00']) == ['1']
+
+    def test_same_day(self):
+        # Without modifier, points in time match the tasks due the same day
+        today = datetime.now().strftime('%Y-%m-%d')
+        assert matching_dated(['due:now']) == ['2', '4']
+        assert matching_dated(['due:' + today + 'T10:00']) == ['2', '4']
+        assert matching_dated(['due:' + today + 'T23:59:59']) == ['2', '4']
+        assert matching_dated(['end:' + today + 'T00:00']) == ['4']
+
+    def test_date_virtual_tags(self):
+        assert matching_dated(['+TODAY']) == ['2']
+        assert matching_dated(['+TOMORROW']) == ['3']
+        assert matching_dated(['+YESTERDAY']) == ['1']
+        # Task due today noon may or may not be overdue yet
+        assert matching_dated(['+OVERDUE']) in (['1'], ['1', '2'])
+        assert matching_dated(['+WAITING']) == ['6']
+        assert matching_dated(['+ACTIVE']) == ['6']
+
+
+class TestTaskSnapshot(object):
+    def make_task(self, data):
+        return data['uuid']
+
+    def test_covers(self):
+        snapshot = TaskSnapshot([], self.make_task, [['project:Home']])
+        assert snapshot.covers(['project:Home'])
+        assert not snapshot.covers(['project:Work'])
+
+        complete = TaskSnapshot([], self.make_task, complete=True)
+        assert complete.covers(['project:Work'])
+
+    def test_filter(self):
+        snapshot = TaskSnapshot(TASKS, self.make_task,
+                                [['project:Home'], ['+office']])
+
+        assert snapshot.filter(['project:Home']) == set(['1', '2', '5'])
+        assert snapshot.filter(['+office']) == set(['3'])
+
+    def test_filter_single(self):
+        # Single filter snapshot is not evaluated again
+        snapshot = TaskSnapshot([TASKS[0], TASKS[2]], self.make_task,
+                                [['project:Home']])
+
+        assert snapshot.filter(['project:Home']) == set(['1', '3'])
+
+    def test_get(self):
+        data = [{'uuid': 'abcdef12-0000-0000-0000-000000000000'}]
+        snapshot = TaskSnapshot(data, lambda d: dict(d), complete=True)
+
+        task = snapshot.get('abcdef12')
+        assert task == data[0]
+        assert snapshot.get(data[0]['uuid']) is task
+        assert snapshot.get('00000000') is None
@@ -0,0 +1,28 @@
+import sys
+from tests.base import MockVim
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki import nvim
+
+
+class TestApplyChanges(object):
+    def test_full(self):
+        changes = {'full': True, 'lines': ['a', 'b']}
+        assert nvim.apply_changes(None, changes) == ['a', 'b']
+
+    def test_no_changes(self):
+        # Neovim returns an empty table as an empty dict
+        changes = {'full': False, 'first': 0, 'old_last': 0, 'lines': {}}
+        assert nvim.apply_changes(['a', 'b'], changes) == ['a', 'b']
+
+    def test_changed_region(self):
+        changes = {'full': False, 'first': 1, 'old_last': 2, 'lines': ['x', 'y']}
+        assert nvim.apply_changes(['a', 'b', 'c'], changes) == ['a', 'x', 'y', 'c']
+
+    def test_removed_lines(self):
+        changes = {'full': False, 'first': 1, 'old_last': 3, 'lines': []}
+        assert nvim.apply_changes(['a', 'b', 'c', 'd'], changes) == ['a', 'd']
+
+    def test_disabled(self):
+        assert not nvim.ENABLED
@@ -0,0 +1,81 @@
+import sys
+from tests.base import MockVim, MockCache
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki import outline
+
+
+class TestOutline(object):
+    def setup(self):
+        self.cache = MockCache()
+        self.cache.buffer.data = [
+            "= Work || project:Work =",     # 0
+            "* [ ] Plan",                    # 1
+            "== Meetings | +meeting ==",    # 2
+            "* [ ] Standup",                 # 3
+            "== Notes ==",                   # 4
+            "=== Ideas || +idea ===",        # 5
+            "* [ ] Write blogpost",          # 6
+        ]
+        self.outline = self.cache.outline
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_lines(self):
+        assert self.outline.headers == [0, 2, 4, 5]
+        assert self.outline.viewport_lines == [2]
+        assert self.outline.task_lines == [1, 3, 6]
+
+    def test_enclosing_header(self):
+        assert self.outline.enclosing_header(0) is None
+        assert self.outline.enclosing_header(1) == 0
+        assert self.outline.enclosing_header(3) == 2
+        assert self.outline.enclosing_header(5) == 4
+
+    def test_preset_chain(self):
+        header = self.cache.presets[5]
+        assert header.taskfilter == ['(', 'project:Work', ')', '(', '+idea', ')']
+        assert self.cache.presets[5] is header
+        assert self.cache.presets[6] is None
+
+        # The headers above were resolved on the way
+        assert sorted(self.cache.presets.store) == [0, 2, 4, 5]
+
+    def test_viewport(self):
+        port = self.cache.viewport[2]
+        assert port.taskfilter[-3:] == ['(', '+meeting', ')']
+        assert 'project:Work' in port.taskfilter
+        assert self.cache.viewport[2] is port
+        assert self.cache.viewport[1] is None
+
+    def test_closest(self):
+        assert outline.closest([1, 3, 6], 4) == 3
+        assert outline.closest([1, 3, 6], 3) == 3
+        assert outline.closest([3, 6], 0) == 3
+        assert outline.closest([], 0) is None
+
+
+class TestParents(object):
+    def setup(self):
+        self.cache = MockCache()
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_nested(self):
+        self.cache.buffer.data = [
+            "* [ ] Root",               # 0
+            "    * [ ] Child",          # 1
+            "        * [ ] Grandchild", # 2
+            "    * [ ] Second child",   # 3
+            "\t* [ ] Tab child",        # 4
+            "Text",                     # 5
+            "    * [ ] Orphan",         # 6
+            "* [ ] Other root",         # 7
+            "",                         # 8
+            "    * [ ] After blank",    # 9
+        ]
+
+        assert self.cache.outline.parents == {1: 0, 2: 1, 3: 0, 4: 0}
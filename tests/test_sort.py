@@ -0,0 +1,76 @@
+import sys
+from tests.base import MockVim
+
+sys.modules['vim'] = MockVim()
+
+from taskwiki.sort import CustomNodeComparator, TaskSorter
+
+
+class TestSortKey(object):
+    def sorted_ids(self, sortformat, tasks):
+        comparator = CustomNodeComparator(sortformat)
+        return [t['id'] for t in sorted(tasks, key=comparator.sort_key)]
+
+    def test_ascending(self):
+        tasks = [dict(id=1, due=3), dict(id=2, due=None), dict(id=3, due=1)]
+        assert self.sorted_ids('due+', tasks) == [3, 1, 2]
+
+    def test_descending(self):
+        # Missing values stay last even in the reversed order
+        tasks = [dict(id=1, due=3), dict(id=2, due=None), dict(id=3, due=1)]
+        assert self.sorted_ids('due-', tasks) == [1, 3, 2]
+
+    def test_multiple_attributes(self):
+        tasks = [
+            dict(id=1, project='B', priority='H'),
+            dict(id=2, project='A', priority='L'),
+            dict(id=3, project='B', priority='M'),
+            dict(id=4, project=None, priority='H'),
+        ]
+        assert self.sorted_ids('project+,priority-', tasks) == [2, 3, 1, 4]
+
+
+class FakeTask(dict):
+    # Hashed by identity, like the unsaved tasklib tasks
+    __hash__ = object.__hash__
+
+
+class FakeVwtask(dict):
+    def __init__(self, task, line_number):
+        super(FakeVwtask, self).__init__(line_number=line_number, indent='')
+        self.task = task
+
+    def update_in_buffer(self):
+        pass
+
+
+class ReorderingCache(object):
+    def __init__(self):
+        self.orders = []
+
+    def reorder_lines(self, offset, old_positions):
+        self.orders.append((offset, old_positions))
+
+
+class TestTaskSorter(object):
+    def sort(self, tasks):
+        vwtasks = [FakeVwtask(task, line) for line, task in enumerate(tasks)]
+        cache = ReorderingCache()
+        TaskSorter(cache, vwtasks, 'line_number+').execute()
+        return cache.orders, [vwtask['indent'] for vwtask in vwtasks]
+
+    def test_saved_dependencies(self):
+        child = FakeTask(uuid='child', depends=set())
+        parent = FakeTask(uuid='parent', depends=set([child]))
+        orders, indents = self.sort([child, parent])
+        assert orders == [(0, [1, 0])]
+        assert indents == ['    ', '']
+
+    def test_unsaved_dependencies(self):
+        # Tasks without UUIDs are linked by identity
+        child = FakeTask(uuid=None, depends=set())
+        other = FakeTask(uuid=None, depends=set())
+        parent = FakeTask(uuid=None, depends=set([child]))
+        orders, indents = self.sort([child, other, parent])
+        assert orders == [(0, [1, 2, 0])]
+        assert indents == ['    ', '', '']
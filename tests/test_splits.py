@@ -1,7 +1,7 @@
 import re
 
 from tests.base import IntegrationTest
-from tasklib import local_zone
+from tasklib import Task, local_zone
 from datetime import datetime
 
 
@@ -174,6 +174,42 @@ class TestProjectsSimple(IntegrationTest):
         assert re.search(work, output, re.MULTILINE)
 
 
+class TestProjectsDataChange(IntegrationTest):
+
+    tasks = [
+        dict(description="home task", project="Home"),
+    ]
+
+    def execute(self):
+        self.command("TaskWikiProjects")
+        assert "Garden" not in '\n'.join(self.read_buffer())
+        self.command("bwipe")
+
+        # The report must not be reused once the data changed
+        Task(self.tw, description="garden task", project="Garden").save()
+
+        self.command("TaskWikiProjects")
+        assert "Garden" in '\n'.join(self.read_buffer())
+
+
+class TestProjectsAsync(IntegrationTest):
+
+    tasks = [
+        dict(description="home task", project="Home"),
+    ]
+
+    def execute(self):
+        self.command("let g:taskwiki_async_reports=1")
+        self.command("TaskWikiProjects")
+        assert self.py("print(vim.current.buffer)", silent=False).startswith("<buffer projects")
+
+        # Give the report time to finish and the output to be streamed
+        self.command("sleep 1")
+
+        output = '\n'.join(self.read_buffer())
+        assert re.search(r'Home\s*1', output, re.MULTILINE)
+
+
 class TestSummarySimple(IntegrationTest):
 
     tasks = [
@@ -1,4 +1,7 @@
+import json
 import sys
+import time
+import tasklib
 from tests.base import MockVim
 
 sys.modules['vim'] = MockVim()
@@ -65,3 +68,138 @@ class TestParsingModstrings(object):
     def test_modstring_to_kwargs_ignore_virtual_tags(self):
         assert util.tw_modstring_to_kwargs("project:Random +PENDING") == {"project":"Random"}
         assert util.tw_modstring_to_kwargs("project:Random -DELETED area:admin") == {"project":"Random", "area":"admin"}
+
+
+class TestDependencyUUIDs(object):
+    def test_lazy_set(self):
+        task = dict(depends=tasklib.lazy.LazyUUIDTaskSet(None, ['a', 'b']))
+        assert util.dependency_uuids(task) == set(['a', 'b'])
+
+    def test_task_set(self):
+        # Unsaved dependencies have no UUID yet
+        task = dict(depends=[dict(uuid='a'), dict(uuid=None)])
+        assert util.dependency_uuids(task) == set(['a'])
+
+    def test_empty(self):
+        assert util.dependency_uuids(dict(depends=None)) == set()
+
+
+class TestImportData(object):
+    def test_lists(self):
+        dependency = tasklib.Task(None, description='Dependency')
+        util.assign_uuid(dependency)
+
+        task = tasklib.Task(None, description='Task', tags=['home', 'work'])
+        util.assign_uuid(task)
+        task['depends'] = set([dependency])
+
+        data = json.loads(util.import_data(task))
+        assert data['uuid'] == task['uuid']
+        assert sorted(data['tags']) == ['home', 'work']
+        assert data['depends'] == [dependency['uuid']]
+
+    def test_empty_lists(self):
+        data = json.loads(util.import_data(tasklib.Task(None, description='Task')))
+        assert data == {'description': 'Task'}
+
+
+class TestUnchangedLineBlocks(object):
+    def test_unchanged(self):
+        lines = ['a', 'b', 'c']
+        assert util.unchanged_line_blocks(lines, list(lines)) == [(0, 0, 3)]
+
+    def test_edited_line(self):
+        old = ['a', 'b', 'c', 'd']
+        new = ['a', 'B', 'c', 'd']
+        assert util.unchanged_line_blocks(old, new) == [(0, 0, 1), (2, 2, 2)]
+
+    def test_inserted_and_deleted_lines(self):
+        old = ['a', 'b', 'c', 'd', 'e']
+        new = ['x', 'a', 'b', 'd', 'e', 'y']
+        assert util.unchanged_line_blocks(old, new) == [(0, 1, 2), (3, 3, 2)]
+
+    def test_empty(self):
+        assert util.unchanged_line_blocks([], ['a']) == []
+        assert util.unchanged_line_blocks(['a'], []) == []
+
+    def test_moved_lines(self):
+        old = ['a', 'b', 'c', 'd']
+        new = ['c', 'a', 'b', 'd']
+        assert util.unchanged_line_blocks(old, new) == [(0, 1, 2), (3, 3, 1)]
+
+    def test_large_edited_page(self):
+        # Every task toggled on a page of tasks separated by blank lines,
+        # the comparison must stay linear
+        old = []
+        for i in range(5000):
+            old += ['* [ ] Task {0}'.format(i), '']
+        new = [line.replace('[ ]', '[X]') for line in old]
+
+        start = time.time()
+        blocks = util.unchanged_line_blocks(old, new)
+        assert time.time() - start < 1
+
+        assert len(blocks) == 5000
+        assert blocks[:2] == [(1, 1, 1), (3, 3, 1)]
+
+
+class TestChangedLineHunks(object):
+    def test_unchanged(self):
+        assert util.changed_line_hunks(['a', 'b'], ['a', 'b']) == []
+
+    def test_hunks(self):
+        old = ['a', 'b', 'c', 'd', 'e']
+        new = ['x', 'a', 'c', 'D', 'e', 'y']
+        hunks = util.changed_line_hunks(old, new)
+        assert hunks == [(0, 0, 0, 1), (1, 2, 2, 2), (3, 4, 3, 4), (5, 5, 5, 6)]
+
+        # Applying the hunks bottom up turns the old lines into the new ones
+        for old_start, old_end, new_start, new_end in reversed(hunks):
+            old[old_start:old_end] = new[new_start:new_end]
+        assert old == new
+
+    def test_frequent_lines(self):
+        # Blank lines are frequent on pages over 200 lines, the ones between
+        # the edited lines must still be matched
+        old = []
+        for i in range(150):
+            old += ['* [ ] Task {0}'.format(i), '']
+
+        new = list(old)
+        for line in (0, 2, 296, 298):
+            new[line] = new[line].replace('[ ]', '[X]')
+
+        hunks = util.changed_line_hunks(old, new)
+        assert hunks == [
+            (0, 1, 0, 1), (2, 3, 2, 3), (296, 297, 296, 297), (298, 299, 298, 299)]
+
+    def test_replace_all(self):
+        assert util.changed_line_hunks(['a'], ['b', 'c']) == [(0, 1, 0, 2)]
+        assert util.changed_line_hunks(['a'], []) == [(0, 1, 0, 0)]
+
+
+class TestCommandBatch(object):
+    def setup(self):
+        self.commands = []
+        util.vim.command = self.commands.append
+
+    def teardown(self):
+        del util.vim.command
+
+    def test_single_call(self):
+        with util.CommandBatch() as batch:
+            batch.command('setlocal nowrap')
+            batch.command('nnoremap <silent> <buffer> q :bwipe<CR>')
+
+        assert self.commands == [
+            'call execute(["setlocal nowrap", "nnoremap <silent> <buffer> q :bwipe<CR>"])'
+        ]
+
+    def test_empty(self):
+        with util.CommandBatch():
+            pass
+
+        assert self.commands == []
+
+    def test_vim_literal(self):
+        assert util.vim_literal(['a\\b "c"', u'\x1b[31m☺']) == u'["a\\\\b \\"c\\"", "\\u001b[31m☺"]'
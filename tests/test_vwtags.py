@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import os
 import re
+import shutil
+import tempfile
 import textwrap
 from itertools import zip_longest
 from extra import vwtags
@@ -93,3 +96,68 @@ class TestTagsVimwikiLinks(TagsTest):
     [[link]]	file.wiki	/^= [[link]] =$/;"	h	line:1
     [[li|nk]]	file.wiki	/^== [[li|nk]] ==$/;"	h	line:2	header:[[link]]
     """
+
+
+class TestTagsNotHeaders(TagsTest):
+    wiki_input = """\
+    * [ ] Task with = sign | and bar
+     = indented =
+    = a =
+    text == b ==
+    """
+
+    expected_output = """\
+    a	file.wiki	/^= a =$/;"	h	line:3
+    """
+
+
+class TestTagsWiki(object):
+    files = {
+        'index.wiki': "= index =\n== b ==\n",
+        'sub/page.wiki': "= a =\ntext\n== c | +PENDING ==\n",
+        'notes.txt': "= ignored =\n",
+        'tags': "",
+    }
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp(dir='/tmp/')
+
+        for filename, content in self.files.items():
+            path = os.path.join(self.dir, filename)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_wiki_files(self):
+        assert vwtags.wiki_files(self.dir, '.wiki') == [
+            'index.wiki', os.path.join('sub', 'page.wiki')]
+
+    def test_generate(self):
+        tags = vwtags.generate(self.dir, 'default', processes=1)
+        assert [tag.split('\t')[:2] for tag in tags] == [
+            ['a', 'sub/page.wiki'],
+            ['b', 'index.wiki'],
+            ['c', 'sub/page.wiki'],
+            ['index', 'index.wiki'],
+        ]
+
+    def test_generate_pool(self):
+        tags = vwtags.generate(self.dir, 'default', processes=2)
+        assert tags == vwtags.generate(self.dir, 'default', processes=1)
+
+    def test_write_tags(self):
+        vwtags.main(['default', '--wiki', self.dir])
+
+        with open(os.path.join(self.dir, 'tags')) as f:
+            lines = f.read().splitlines()
+
+        assert lines[0].startswith('!_TAG_FILE_FORMAT')
+        assert lines[1].startswith('!_TAG_FILE_SORTED\t1')
+        assert lines[2:] == vwtags.generate(self.dir, 'default')
+
+        # No temporary file is left behind
+        assert sorted(os.listdir(self.dir)) == ['index.wiki', 'notes.txt', 'sub', 'tags']
@@ -26,6 +26,30 @@ class TestSimpleTaskCreation(IntegrationTest):
         assert task['status'] == 'pending'
 
 
+class TestSimpleTaskCreationAsync(IntegrationTest):
+
+    viminput = """
+    * [ ] This is a test task
+    """
+
+    vimoutput = """
+    * [ ] This is a test task  #{uuid}
+    """
+
+    def execute(self):
+        self.command("let g:taskwiki_async_save=1")
+        self.command("w", regex="written$", lines=1)
+
+        # Finish the save without waiting for the timer to fire
+        self.py("cache.wait_for_saves()")
+        self.py("cache().complete_save()")
+
+        assert len(self.tw.tasks.pending()) == 1
+
+        task = self.tw.tasks.pending()[0]
+        assert task['description'] == 'This is a test task'
+
+
 class TestInvalidUUIDTask(IntegrationTest):
 
     viminput = """
@@ -520,6 +544,107 @@ class TestChildTaskModification(IntegrationTest):
         assert parent['depends'] == set([child])
 
 
+class TestImportTasksWithTags(IntegrationTest):
+
+    viminput = """
+    == Work tasks | +work +office ==
+    * [ ] First tagged task
+    * [ ] Second tagged task
+    """
+
+    vimoutput = """
+    == Work tasks | +work +office ==
+    * [ ] First tagged task  #{uuid}
+    * [ ] Second tagged task  #{uuid}
+    """
+
+    def execute(self):
+        self.command("w", regex="written$", lines=1)
+        assert len(self.tw.tasks.pending()) == 2
+
+        for task in self.tw.tasks.pending():
+            assert task['tags'] == set(['work', 'office'])
+
+
+class TestImportNestedDependencies(IntegrationTest):
+
+    viminput = """
+    * [ ] This is top task
+      * [ ] This is middle task
+        * [ ] This is bottom task
+      * [ ] This is sibling task
+    """
+
+    vimoutput = """
+    * [ ] This is top task  #{uuid}
+      * [ ] This is middle task  #{uuid}
+        * [ ] This is bottom task  #{uuid}
+      * [ ] This is sibling task  #{uuid}
+    """
+
+    def execute(self):
+        self.command("w", regex="written$", lines=1)
+        assert len(self.tw.tasks.pending()) == 4
+
+        top = self.tw.tasks.filter(description="This is top task")[0]
+        middle = self.tw.tasks.filter(description="This is middle task")[0]
+        bottom = self.tw.tasks.filter(description="This is bottom task")[0]
+        sibling = self.tw.tasks.filter(description="This is sibling task")[0]
+
+        assert top['depends'] == set([middle, sibling])
+        assert middle['depends'] == set([bottom])
+        assert bottom['depends'] == set()
+
+
+class TestImportCompletedTask(IntegrationTest):
+
+    viminput = """
+    * [X] This is done task
+    * [ ] This is pending task
+    """
+
+    vimoutput = """
+    * [X] This is done task  #{uuid}
+    * [ ] This is pending task  #{uuid}
+    """
+
+    def execute(self):
+        self.command("w", regex="written$", lines=1)
+
+        assert len(self.tw.tasks.pending()) == 1
+        assert len(self.tw.tasks.completed()) == 1
+
+        task = self.tw.tasks.completed()[0]
+        assert task['description'] == 'This is done task'
+        assert task['end'] is not None
+
+
+class TestImportRecurringFallback(IntegrationTest):
+
+    # Recurring tasks are added one by one, as are the tasks depending
+    # on them, while the rest is imported
+    viminput = """
+    * [ ] This is parent task
+      * [ ] This is recurring task (2030-01-01) -- recur:weekly
+    * [ ] This is imported task
+    """
+
+    def execute(self):
+        self.command("w", regex="written$", lines=1)
+
+        template = self.tw.tasks.filter(status='recurring')[0]
+        parent = self.tw.tasks.filter(description="This is parent task")[0]
+        imported = self.tw.tasks.filter(description="This is imported task")[0]
+
+        assert template['description'] == 'This is recurring task'
+        assert template['recur'] == 'weekly'
+        assert parent['depends'] == set([template])
+        assert imported['status'] == 'pending'
+
+        # All the tasks got their UUIDs in the buffer
+        assert all('#' in line for line in self.read_buffer()[:3])
+
+
 class TestCreationDifferentTaskSource(MultipleSourceTest):
 
     viminput = """
@@ -105,3 +105,39 @@ class TestParsingVimwikiTask(object):
         vwtask = self.VimwikiTask.from_line(self.cache, 0)
 
         assert vwtask['description'] == u"Task https://somewhere/dash--dash"
+
+
+class TestLineStoreRetain(object):
+    def setup(self):
+        self.mockvim = MockVim()
+        self.cache = MockCache()
+        sys.modules['vim'] = self.mockvim
+        from taskwiki.vwtask import VimwikiTask
+        self.VimwikiTask = VimwikiTask
+
+    def teardown(self):
+        self.cache.reset()
+
+    def test_retain_moves_unchanged_lines(self):
+        self.cache.buffer.data = ["* [ ] First task", "Text", "* [ ] Second task"]
+        first = self.cache.line[(self.VimwikiTask, 0)]
+        second = self.cache.line[(self.VimwikiTask, 2)]
+        assert not self.cache.line[(self.VimwikiTask, 1)]
+
+        # Insert a line on the top and edit the text line
+        self.cache.buffer.data = ["Title", "* [ ] First task", "Edited", "* [ ] Second task"]
+        self.cache.line.retain([(0, 1, 1), (2, 3, 1)])
+
+        assert self.cache.line.store == [
+            None, {self.VimwikiTask: first}, None, {self.VimwikiTask: second}
+        ]
+
+    def test_retain_drops_outdated_lines(self):
+        self.cache.buffer.data = ["* [ ] First task"]
+        self.cache.line[(self.VimwikiTask, 0)]
+
+        # Line was rewritten in place, without being parsed again
+        self.cache.buffer.data = ["* [ ] First task  #abcd1234"]
+        self.cache.line.retain([(0, 0, 1)])
+
+        assert self.cache.line.store == [None]